@@ -0,0 +1,272 @@
+import time
+from connectfour import ConnectFour
+from nim import Nim
+from dotsandboxes import DotsAndBoxes
+from minimax import minimax
+from alphabeta import alphabeta
+from scout import scout, pvs
+from iterativedeepening import iterative_deepening, MAX_ITERATIONS
+from moveordering import MoveOrderer
+from parallelsearch import parallel_root_search
+from lazysmp import lazy_smp_search
+from mcts import mcts_search, ROOT_PARALLEL, LEAF_PARALLEL
+from transpositiontable import TranspositionTable, REPLACEMENT_SCHEMES, DEPTH_PREFERRED
+from selective import selective_search, BEAM
+from mtdf import windowed_search, MTDF, ASPIRATION, ASPIRATION_WINDOW
+from scores import INF
+from nimsolver import nim_solver_search
+from tablebase import Tablebase
+from openingbook import OpeningBook, book_variant, NEGAMAX, SCOUT
+from searchstats import SearchStats, SamplingProfiler
+from vectorheuristic import EVALUATORS, np
+
+# library entry point: run one agent on a position without the minimax baseline
+#   result = run_agent(game, depth, game_size, 'cmp4', {'time': '1'})
+#   result.move, result.value, result.nodes, result.time, result.tt_stats
+# options are main.py's flags without the dashes ({'ordering': True, 'nodes': '5000'}, ...)
+
+AGENTS = ['cmp1', 'cmp2', 'cmp3', 'cmp4', 'cmp5', 'cmp6']
+
+class SearchResult:
+    # what one agent run found. value is from the maximizer's point of view (a win probability for
+    # cmp6, None when a budget ran out before depth 1); the rest are None when the agent has none
+    def __init__(self, agent, move, value, nodes, seconds, tt_stats=None, depth=None, coverage=None, windows=None,
+                 book=None, stats=None, profiler=None, orderer=None):
+        self.agent = agent
+        self.move = move
+        self.value = value
+        self.nodes = nodes
+        self.time = seconds
+        self.tt_stats = tt_stats
+        # depth reached under a budget, selective coverage report, windowed driver report
+        self.depth = depth
+        self.coverage = coverage
+        self.windows = windows
+        # (entries loaded, entries saved) of an opening book
+        self.book = book
+        # detailed counters (SearchStats), sampling profiler and move orderer, for their summaries
+        self.stats = stats
+        self.profiler = profiler
+        self.orderer = orderer
+
+    def as_dict(self):
+        # plain values only (json-ready apart from the move's own type)
+        return {'agent': self.agent, 'move': self.move, 'value': self.value, 'nodes': self.nodes, 'time': self.time,
+                'tt_stats': self.tt_stats, 'depth': self.depth, 'coverage': self.coverage, 'windows': self.windows,
+                'book': {'loaded': self.book[0], 'saved': self.book[1]} if self.book is not None else None}
+
+def game_name(game):
+    if isinstance(game, ConnectFour):
+        return 'connectfour'
+    if isinstance(game, Nim):
+        return 'nim'
+    if isinstance(game, DotsAndBoxes):
+        return 'dotsandboxes'
+    raise ValueError(f"unknown game: {type(game).__name__}")
+
+def agent_settings(game_choice, agent, options):
+    # the agent's search settings from the options; raises ValueError for a combination it can't run
+    if agent not in AGENTS:
+        raise ValueError(f"unknown agent: {agent}")
+    if options.get('tt-replace', DEPTH_PREFERRED) not in REPLACEMENT_SCHEMES:
+        raise ValueError("unknown replacement scheme")
+
+    # per-move budget ==> iterative deepening instead of a fixed depth
+    time_limit = float(options['time']) if 'time' in options else None
+    node_limit = int(options['nodes']) if 'nodes' in options else None
+    budgeted = time_limit is not None or node_limit is not None
+    if budgeted and agent == 'cmp3':
+        raise ValueError("cmp3 has no budgeted search")
+
+    # move ordering: the alpha-beta family's cutoffs (cmp3's minimax and cmp6's tree search have none)
+    if options.get('ordering') and agent in ['cmp3', 'cmp6']:
+        raise ValueError("move ordering is cmp1/cmp2/cmp4/cmp5 only")
+
+    # selective search: best moves only, within a node/time budget (same budget options as iterative deepening)
+    selective = bool(options.get('selective'))
+    if (selective and (not budgeted or agent not in ['cmp1', 'cmp4'] or options.get('ordering'))) or ('beam' in options and not selective):
+        raise ValueError("selective search is cmp1/cmp4 with a budget and without --ordering")
+    beam = options.get('beam', BEAM)
+    beam = None if beam == 'none' else int(beam)
+    seed = int(options.get('seed', 0))
+
+    # windowed drivers: iterative deepening (to the fixed depth, or within the budget) with zero/narrow windows
+    driver = MTDF if options.get('mtdf') else ASPIRATION if options.get('aspiration') else None
+    window = ASPIRATION_WINDOW if options.get('aspiration') in (None, True) else int(options['aspiration'])
+    if driver is not None and (agent not in ['cmp1', 'cmp4'] or selective or (options.get('mtdf') and options.get('aspiration'))
+                               or (driver == MTDF and agent != 'cmp4')):
+        raise ValueError("mtd(f) is cmp4 only, aspiration windows cmp1/cmp4")
+
+    # monte carlo tree search: anytime, within an iteration and/or time budget
+    iterations = int(options['iterations']) if 'iterations' in options else None
+    if (iterations is not None or options.get('leaf-parallel')) and agent != 'cmp6':
+        raise ValueError("iterations and leaf parallelism are cmp6 only")
+    if agent == 'cmp6' and node_limit is not None:
+        raise ValueError("cmp6 has no node budget")
+
+    # root splitting over a process pool (fixed depth only); cmp6 runs parallel trees or playouts
+    workers = int(options['workers']) if 'workers' in options else None
+    if workers is not None and (budgeted or driver is not None) and agent != 'cmp6':
+        raise ValueError("root splitting needs a fixed depth")
+
+    # lazy smp: helper processes fill a shared-memory table for the main search (fixed depth, tt agents)
+    threads = int(options['lazysmp']) if 'lazysmp' in options else None
+    if threads is not None and (budgeted or workers is not None or agent not in ['cmp4', 'cmp5'] or driver is not None):
+        raise ValueError("lazy smp is cmp4/cmp5 at a fixed depth")
+
+    # real dots and boxes rules; the original scout assumes sides alternate every move
+    if (options.get('extra-turn') or options.get('macro')) and (game_choice != 'dotsandboxes' or (agent in ['cmp2', 'cmp5'] and not options.get('pvs'))):
+        raise ValueError("extra turns are dotsandboxes only (cmp2/cmp5 need --pvs)")
+
+    # canonical keys: only the negamax table agents read them (the original scout keeps raw keys)
+    if options.get('symmetry') and agent not in ['cmp3', 'cmp4'] and not (agent == 'cmp5' and options.get('pvs')):
+        raise ValueError("symmetry is cmp3/cmp4 (cmp5 needs --pvs)")
+
+    # persistent opening book: needs the agent's own (single-process) table
+    book_path = options.get('book')
+    if book_path is not None and (agent not in ['cmp3', 'cmp4', 'cmp5'] or workers is not None or threads is not None):
+        raise ValueError("the opening book needs a single-process table agent")
+
+    # exact nim play: at the root instead of searching, or as a perfect leaf evaluation
+    nim_solver = options.get('nim-solver')
+    if nim_solver is not None and (game_choice != 'nim' or nim_solver not in ['root', 'leaf']):
+        raise ValueError("the nim solver is nim only, at the root or the leaves")
+    # connectfour leaf evaluation: incremental window scores or numpy arrays instead of list slices
+    evaluator = options.get('eval')
+    if evaluator is not None and (game_choice != 'connectfour' or evaluator not in EVALUATORS):
+        raise ValueError("unknown connectfour evaluator")
+    # leaf batching: frontier positions evaluated in bulk
+    batch_leaves = options.get('batch-leaves')
+    if batch_leaves is not None:
+        batch_leaves = 2 if batch_leaves is True else int(batch_leaves)
+        if np is None or batch_leaves < 1 or (agent in ['cmp2', 'cmp5'] and not options.get('pvs')):
+            raise ValueError("leaf batching needs numpy (and pvs for cmp2/cmp5)")
+
+    return {'time_limit': time_limit, 'node_limit': node_limit, 'budgeted': budgeted, 'selective': selective, 'beam': beam,
+            'seed': seed, 'driver': driver, 'window': window, 'iterations': iterations, 'workers': workers,
+            'threads': threads, 'book': book_path, 'nim_solver': nim_solver, 'evaluator': evaluator,
+            'batch_leaves': batch_leaves}
+
+def run_agent(game, depth, game_size, agent, options=None, maximizingPlayer=True):
+    # one search by the agent (cmp1-cmp6) on the game, depth being the game's fixed search depth.
+    # attaches the agent's leaf helpers (oracle, tablebase, evaluator, batching) to the game
+    options = options or {}
+    settings = agent_settings(game_name(game), agent, options)
+    time_limit, node_limit, budgeted = settings['time_limit'], settings['node_limit'], settings['budgeted']
+    workers, threads = settings['workers'], settings['threads']
+
+    if settings['nim_solver'] == 'leaf':
+        game.oracle = True
+    if 'tablebase' in options:
+        # a table built for another game or size is simply never probed
+        game.tablebase = Tablebase(options['tablebase'])
+    if settings['evaluator'] is not None:
+        # same scores as the heuristic, computed faster
+        game.evaluator = EVALUATORS[settings['evaluator']](game)
+    if settings['batch_leaves'] is not None:
+        game.batch_leaves = settings['batch_leaves']
+
+    # detailed counters only on request, plain node counts otherwise
+    node_counter = SearchStats(bool(options.get('stats')))
+    profiler = SamplingProfiler() if options.get('profile') else None
+    orderer = MoveOrderer() if options.get('ordering') else None
+    has_tt = agent in ['cmp3', 'cmp4', 'cmp5']
+
+    # bounded table (fixed memory budget + replacement scheme) if tt-mb is given, array-backed with tt-packed
+    tt_mb = float(options['tt-mb']) if 'tt-mb' in options else None
+    if has_tt and threads is None:
+        tt = TranspositionTable(tt_mb, options.get('tt-replace', DEPTH_PREFERRED), bool(options.get('tt-packed')))
+    else:
+        tt = None
+
+    # exact entries from earlier runs of the same game variant
+    book = None
+    if settings['book'] is not None and tt is not None:
+        search = SCOUT if agent in ['cmp2', 'cmp5'] and not options.get('pvs') else NEGAMAX
+        book = OpeningBook(settings['book'], book_variant(game, game_size, search))
+        book_loaded = book.warm(tt)
+
+    depth_reached = None
+    coverage = None
+    windows = None
+    tt_stats = None
+
+    if profiler is not None:
+        profiler.start()
+    start_time = time.time()
+    # the profiler's signal timer stops even when the search raises
+    try:
+        # NIM SOLVER: no search at all
+        if settings['nim_solver'] == 'root':
+            name = "Nim Solver"
+            best_move, value = nim_solver_search(game, game_size, maximizingPlayer, node_counter)
+            tt = None
+
+        # COMPARISON 6: monte carlo tree search (no depth limit, quality grows with the budget)
+        elif agent == 'cmp6':
+            name = "Monte Carlo Tree Search"
+            parallel = LEAF_PARALLEL if options.get('leaf-parallel') else ROOT_PARALLEL
+            best_move, value = mcts_search(game, game_size, maximizingPlayer, node_counter, settings['iterations'], time_limit,
+                                           workers, parallel, settings['seed'])
+
+        # COMPARISONS 1 AND 4: minimax w/ alpha-beta algo (+ transposition tables)
+        elif agent in ['cmp1', 'cmp4']:
+            name = "Alpha-Beta Pruning" + (" + Transposition" if agent == 'cmp4' else "")
+            if settings['selective']:
+                name = "Selective Search" + (" + Transposition" if tt is not None else "")
+                best_move, value, coverage = selective_search(game, game_size, maximizingPlayer, node_counter, node_limit, time_limit,
+                                                              settings['seed'], settings['beam'], tt=tt)
+                depth_reached = coverage['depth']
+            elif settings['driver'] is not None:
+                name = ("MTD(f)" if settings['driver'] == MTDF else "Aspiration Windows") + (" + Transposition" if tt is not None else "")
+                best_move, value, windows = windowed_search(game, game_size, maximizingPlayer, node_counter, tt, settings['driver'],
+                                                            MAX_ITERATIONS if budgeted else depth,
+                                                            time_limit, node_limit, orderer, settings['window'])
+                depth_reached = windows['depth']
+            elif budgeted:
+                best_move, value, depth_reached = iterative_deepening(game, game_size, maximizingPlayer, node_counter, tt, alphabeta,
+                                                                      time_limit=time_limit, node_limit=node_limit, orderer=orderer)
+            elif workers is not None:
+                best_move, value = parallel_root_search(game, depth, game_size, maximizingPlayer, node_counter, alphabeta, has_tt, workers)
+            elif threads is not None:
+                best_move, value, tt_stats = lazy_smp_search(game, depth, game_size, maximizingPlayer, node_counter, alphabeta,
+                                                             threads, tt_mb or 64, orderer)
+            else:
+                best_move, value = alphabeta(game, depth, game_size, -INF, INF, maximizingPlayer, node_counter, tt, orderer)
+
+        # COMPARISON 3: minimax + transposition tables
+        elif agent == 'cmp3':
+            name = "Minimax + Transposition"
+            if workers is not None:
+                best_move, value = parallel_root_search(game, depth, game_size, maximizingPlayer, node_counter, minimax, has_tt, workers)
+            else:
+                best_move, value = minimax(game, depth, game_size, maximizingPlayer, node_counter, tt)
+
+        # COMPARISONS 2 AND 5: scout or pvs (+ transposition tables)
+        else:
+            search = pvs if options.get('pvs') else scout
+            name = ("PVS" if options.get('pvs') else "Scout") + (" + Transposition" if agent == 'cmp5' else "")
+            if budgeted:
+                best_move, value, depth_reached = iterative_deepening(game, game_size, maximizingPlayer, node_counter, tt, search,
+                                                                      time_limit=time_limit, node_limit=node_limit, orderer=orderer)
+            elif workers is not None:
+                best_move, value = parallel_root_search(game, depth, game_size, maximizingPlayer, node_counter, search, has_tt, workers)
+            elif threads is not None:
+                best_move, value, tt_stats = lazy_smp_search(game, depth, game_size, maximizingPlayer, node_counter, search,
+                                                             threads, tt_mb or 64, orderer)
+            else:
+                best_move, value = search(game, depth, game_size, -INF, INF, maximizingPlayer, node_counter, tt, orderer)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    seconds = time.time() - start_time
+
+    book_counts = None
+    if book is not None:
+        book_counts = (book_loaded, book.save(tt))
+        book.close()
+
+    if tt is not None and workers is None:
+        tt_stats = tt.stats()
+    return SearchResult(name, best_move, value, node_counter.nodes, seconds, tt_stats, depth_reached, coverage, windows,
+                        book_counts, node_counter if node_counter.enabled else None, profiler, orderer)
@@ -1,111 +1,14 @@
-from heuristic import evaluate
-from connectfour import ConnectFour, PLAYER1, PLAYER2
-from dotsandboxes import DotsAndBoxes
-from nim import Nim
-from minimax import apply_move, undo_move
-from transpositiontable import TranspositionTable, EXACT, LOWERBOUND, UPPERBOUND
+from negamax import negamax
 
-def alphabeta(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt):
-    node_counter['nodes'] += 1
-    original_alpha = alpha
-    original_beta = beta
-    state_key = game.get_state_key(maximizingPlayer)
-
-    # transposition table (if specified) lookup
-    if tt is not None:
-        found, tt_move, tt_value = tt.ab_lookup(state_key, depth, alpha, beta)
-        if found:
-            return tt_move, tt_value
-
-    # check if terminal node / if depth is reached
-    is_terminal = game.is_terminal_node()
-    winner = game.get_winner(maximizingPlayer)
-    if depth == 0 or is_terminal:
-        if winner is not None:
-            if winner:
-                return (None, float('inf'))
-            elif winner is False:
-                return (None, float('-inf'))
-            else:
-                return (None, 0)  # Draw
-        else:
-            return (None, evaluate(game, maximizingPlayer))
-
-    if isinstance(game, Nim):
-        valid_moves = game.get_valid_moves(game_size)
-    else:
-        valid_moves = game.get_valid_moves()
-
-    # similar to minimax algorithm here (+ alpha-beta cutoff)
+def alphabeta(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt, orderer=None):
+    # alpha-beta on the negamax core; the window and value are from the maximizer's point of view
     if maximizingPlayer:
-        value = float('-inf')
-        best_move = None
-
-        for move in valid_moves:
-            
-            # apply move
-            if hasattr(game, 'set_current_player'):
-                game.set_current_player(PLAYER1 if maximizingPlayer else PLAYER2)
-            apply_move(game, move, maximizingPlayer)
-
-            # recurse
-            _, new_score = alphabeta(game, depth - 1, game_size, alpha, beta, False, node_counter, tt)
-
-            # undo move
-            undo_move(game, move, maximizingPlayer)
-
-            if new_score > value:
-                value = new_score
-                best_move = move
-
-            alpha = max(alpha, value)
-            if alpha >= beta:
-                break
-
-        # store in transposition table (if specified)
-        if tt is not None:
-            if value <= original_alpha:
-                move_flag = UPPERBOUND
-            elif value >= original_beta:
-                move_flag = LOWERBOUND
-            else:
-                move_flag = EXACT
-            tt.ab_store(state_key, depth, value, best_move, move_flag, original_alpha, original_beta)
-
-        return best_move, value
-
-    else:
-        value = float('inf')
-        best_move = None
-
-        for move in valid_moves:
-            # apply move
-            if hasattr(game, 'set_current_player'):
-                game.set_current_player(PLAYER1 if maximizingPlayer else PLAYER2)
-            apply_move(game, move, maximizingPlayer)
-
-            # recurse
-            _, new_score = alphabeta(game, depth - 1, game_size, alpha, beta, True, node_counter, tt)
-
-            # undo move
-            undo_move(game, move, maximizingPlayer)
-
-            if new_score < value:
-                value = new_score
-                best_move = move
-
-            beta = min(beta, value)
-            if alpha >= beta:
-                break
-
-        # store in transposition table (if specified)
-        if tt is not None:
-            if value <= original_alpha:
-                move_flag = UPPERBOUND
-            elif value >= original_beta:
-                move_flag = LOWERBOUND
-            else:
-                move_flag = EXACT
-            tt.ab_store(state_key, depth, value, best_move, move_flag, original_alpha, original_beta)
-
-        return best_move, value
+        return negamax(game, depth, game_size, 1, node_counter, tt, alpha, beta, orderer=orderer)
+    best_move, value = negamax(game, depth, game_size, -1, node_counter, tt, -beta, -alpha, orderer=orderer)
+    return best_move, -value
+
+def order_tt_move(valid_moves, tt_move):
+    # search the move stored for this position (e.g. by a shallower iteration) first
+    if tt_move is not None and tt_move in valid_moves:
+        valid_moves.remove(tt_move)
+        valid_moves.insert(0, tt_move)
@@ -0,0 +1,193 @@
+import copy
+import csv
+import json
+import random
+import statistics
+import sys
+import time
+from main import make_game, parse_options as parse_main_options, OPTIONS as MAIN_OPTIONS
+from minimax import minimax
+from selective import selective_search
+from mtdf import MTDF, ASPIRATION
+from agents import run_agent, agent_settings
+from searchstats import SearchStats
+
+# agent -> (main.py agent, the options that select it), None for the minimax baseline main.py compares
+# against; every other agent runs through agents.run_agent with the command line's main.py options
+AGENTS = {
+    'minimax': None,
+    'cmp1': ('cmp1', {}),
+    'cmp2': ('cmp2', {}),
+    'cmp3': ('cmp3', {}),
+    'cmp4': ('cmp4', {}),
+    'cmp5': ('cmp5', {}),
+    'pvs': ('cmp2', {'pvs': True}),
+    'pvs+tt': ('cmp5', {'pvs': True}),
+    'cmp6': ('cmp6', {}),
+    # iterative deepening to the same depth, each depth by the windowed driver
+    MTDF: ('cmp4', {'mtdf': True}),
+    ASPIRATION: ('cmp4', {'aspiration': True}),
+}
+GAMES = ['connectfour', 'nim', 'dotsandboxes']
+SIZES = ['small', 'medium', 'large']
+STATES = ['initial', 'random']
+OPTIONS = {'games', 'sizes', 'agents', 'states', 'positions', 'repeats', 'warmup', 'seed', 'csv', 'json', 'baseline', 'tolerance'}
+
+USAGE = """Usage: python benchmark.py [options]
+Options:
+    --games=LIST          comma-separated games (default: all)
+    --sizes=LIST          comma-separated sizes (default: small,medium)
+    --agents=LIST         comma-separated agents: minimax, cmp1-cmp6, pvs, pvs+tt, mtdf, aspiration (default: all)
+    --states=LIST         initial and/or random (default: both)
+    --positions=N         seeded positions per random state (default: 5)
+    --repeats=N           timed runs per position (default: 5)
+    --warmup=N            untimed runs per position first (default: 1)
+    --seed=N              seed of the position set (default: 0)
+    --csv=PATH / --json=PATH              write the results
+    --baseline=PATH       compare with an earlier --json; exit 1 on a regression
+    --tolerance=F         allowed slowdown of the median time against the baseline (default: 0.25)
+    (any other main.py option, e.g. --bitboard, --tt-mb=1 or --ordering, is passed on to the games and to every
+    agent but minimax; an agent that can't run the options prints this usage, as main.py does)"""
+
+def parse_options(args):
+    return parse_main_options(args, OPTIONS | MAIN_OPTIONS, USAGE)
+
+def positions(game_choice, game_size, state, count, seed, options):
+    # the same seed always gives the same positions (the games randomize through the random module)
+    games = []
+    for i in range(1 if state == 'initial' else count):
+        random.seed(f"{seed}-{game_choice}-{game_size}-{i}")
+        games.append(make_game(game_choice, game_size, state, options))
+    return games
+
+def agent_options(agent, options):
+    # the agent's run_agent options: main.py's from the command line (the benchmark's own --seed picks
+    # positions, not the agents' seed) plus the ones that select the agent
+    main_agent, selecting = AGENTS[agent]
+    return main_agent, {**{name: value for name, value in options.items() if name not in OPTIONS}, **selecting}
+
+def run(agent, game, depth, game_size, options):
+    # one search on a copy of the position; returns (seconds, nodes, tt stats or None)
+    game = copy.deepcopy(game)
+    # anything drawing from the random module stays reproducible too
+    random.seed(0)
+    if AGENTS[agent] is None:
+        node_counter = SearchStats()
+        start = time.perf_counter()
+        if game_size == 'large' and type(game).__name__ == 'DotsAndBoxes':
+            # same default node budget and seed as main's baseline
+            selective_search(game, game_size, True, node_counter)
+        else:
+            minimax(game, depth, game_size, True, node_counter, None)
+        return time.perf_counter() - start, node_counter.nodes, None
+    # a fresh transposition table (and seeded cmp6 tree) every run
+    main_agent, run_options = agent_options(agent, options)
+    result = run_agent(game, depth, game_size, main_agent, run_options)
+    return result.time, result.nodes, result.tt_stats
+
+def percentile(values, fraction):
+    # nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def benchmark_case(agent, games, game_size, repeats, warmup, options):
+    times = []
+    nodes = 0
+    hits = misses = 0
+    for game, depth in games:
+        for _ in range(warmup):
+            run(agent, game, depth, game_size, options)
+        for _ in range(repeats):
+            elapsed, run_nodes, tt_stats = run(agent, game, depth, game_size, options)
+            times.append(elapsed)
+        # node counts and table stats are deterministic per position, the last run stands for all
+        nodes += run_nodes
+        if tt_stats is not None:
+            hits += tt_stats['hits']
+            misses += tt_stats['misses']
+    position_time = sum(times) / repeats
+    return {
+        'median_s': statistics.median(times),
+        'p95_s': percentile(times, 0.95),
+        'nodes': nodes // len(games),
+        'nodes_per_s': nodes / position_time if position_time > 0 else 0.0,
+        'tt_hit_rate': hits / (hits + misses) if hits + misses else None,
+    }
+
+def compare(results, baseline, tolerance):
+    # regressions: more nodes than before, or a median time beyond the tolerance
+    # rows only compare over the same positions (count and seed)
+    key = lambda row: (row['game'], row['size'], row['state'], row['agent'], row['positions'], row['seed'])
+    previous = {key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(key(row))
+        if before is None:
+            continue
+        if row['nodes'] > before['nodes']:
+            regressions.append(f"{row['game']} {row['size']} {row['state']} {row['agent']}: nodes {before['nodes']} -> {row['nodes']}")
+        if row['median_s'] > before['median_s'] * (1 + tolerance):
+            regressions.append(f"{row['game']} {row['size']} {row['state']} {row['agent']}: median {before['median_s']:.6f}s -> {row['median_s']:.6f}s")
+    return regressions
+
+def main():
+    options = parse_options(sys.argv[1:])
+    games = options['games'].split(',') if 'games' in options else GAMES
+    sizes = options['sizes'].split(',') if 'sizes' in options else SIZES[:2]
+    agents = options['agents'].split(',') if 'agents' in options else list(AGENTS)
+    states = options['states'].split(',') if 'states' in options else STATES
+    if not (set(games) <= set(GAMES) and set(sizes) <= set(SIZES) and set(agents) <= set(AGENTS) and set(states) <= set(STATES)):
+        print(USAGE)
+        sys.exit(1)
+    count = int(options.get('positions', 5))
+    repeats = int(options.get('repeats', 5))
+    warmup = int(options.get('warmup', 1))
+    seed = options.get('seed', '0')
+    # every case needs at least one timed run (and position) to report
+    if count < 1 or repeats < 1 or warmup < 0:
+        print(USAGE)
+        sys.exit(1)
+    # every agent can run the options (see agents.agent_settings) before anything is timed
+    for game_choice in games:
+        for agent in agents:
+            if AGENTS[agent] is None:
+                continue
+            try:
+                agent_settings(game_choice, *agent_options(agent, options))
+            except ValueError:
+                print(USAGE)
+                sys.exit(1)
+
+    results = []
+    print(f"{'game':<13}{'size':<8}{'state':<9}{'agent':<11}{'median s':>11}{'p95 s':>11}{'nodes':>10}{'nodes/s':>12}{'tt hits':>9}")
+    for game_choice in games:
+        for game_size in sizes:
+            for state in states:
+                position_set = positions(game_choice, game_size, state, count, seed, options)
+                for agent in agents:
+                    row = {'game': game_choice, 'size': game_size, 'state': state, 'agent': agent,
+                           'positions': len(position_set), 'seed': seed}
+                    row.update(benchmark_case(agent, position_set, game_size, repeats, warmup, options))
+                    results.append(row)
+                    hit_rate = f"{row['tt_hit_rate']:.0%}" if row['tt_hit_rate'] is not None else '-'
+                    print(f"{game_choice:<13}{game_size:<8}{state:<9}{agent:<11}{row['median_s']:>11.6f}{row['p95_s']:>11.6f}"
+                          f"{row['nodes']:>10}{row['nodes_per_s']:>12.0f}{hit_rate:>9}")
+
+    if 'csv' in options:
+        with open(options['csv'], 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    if 'json' in options:
+        with open(options['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+    if 'baseline' in options:
+        with open(options['baseline']) as f:
+            regressions = compare(results, json.load(f), float(options.get('tolerance', 0.25)))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import random
+from zobrist import player_keys, side_to_move
 
 EMPTY = 0
 PLAYER1 = 1  
@@ -11,7 +12,8 @@ SYMBOLS = {
 }
 
 class ConnectFour:
-    def __init__(self, initial_state, game_size):
+    # symmetry: also keep the hash of the mirrored board, so mirror images share one canonical key
+    def __init__(self, initial_state, game_size, symmetry=False):
         self.rows = 4
         self.cols = 4
         if(game_size == 'medium'):
@@ -21,11 +23,52 @@ class ConnectFour:
             self.rows = 6
             self.cols = 7
         self.initial = initial_state
+        # the heuristic's center column (cols // 2) is only on the mirror axis of an odd width: an even
+        # board's mirror image can score differently, so it keeps plain keys
+        self.symmetry = symmetry and self.cols % 2 == 1
+        # incremental heuristic (vectorheuristic.IncrementalEvaluator), attached by the caller
+        self.evaluator = None
+        self.piece_keys = self.init_piece_keys()
+        self.mirror_keys = self.init_mirror_keys()
         self.board = self.initialize_board()
+        self.hash = self.compute_hash()
+        self.mirror_hash = self.compute_hash(self.mirror_keys)
 
     def get_state_key(self, maximizingPlayer):
         return (maximizingPlayer, tuple(tuple(row) for row in self.board))
 
+    def get_hash(self, maximizingPlayer):
+        return side_to_move(self.hash, maximizingPlayer)
+
+    def get_canonical_hash(self, maximizingPlayer):
+        # (key, frame): frame 1 means the mirrored board is the canonical one
+        if self.mirror_hash < self.hash:
+            return side_to_move(self.mirror_hash, maximizingPlayer), 1
+        return side_to_move(self.hash, maximizingPlayer), 0
+
+    def to_canonical_move(self, col, frame):
+        return self.cols - 1 - col if frame else col
+
+    def from_canonical_move(self, col, frame):
+        return self.cols - 1 - col if frame else col
+
+    def init_piece_keys(self):
+        keys = player_keys('connectfour', self.rows * self.cols)
+        return [keys[row * self.cols:(row + 1) * self.cols] for row in range(self.rows)]
+
+    def init_mirror_keys(self):
+        # key of the mirrored cell, so the mirror hash updates like the normal one
+        return [row[::-1] for row in self.piece_keys]
+
+    def compute_hash(self, keys=None):
+        keys = keys or self.piece_keys
+        key = 0
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if self.board[row][col] != EMPTY:
+                    key ^= keys[row][col][self.board[row][col]]
+        return key
+
     def verify_board(self, board):
         player1_count = sum(cell == PLAYER1 for row in board for cell in row)
         player2_count = sum(cell == PLAYER2 for row in board for cell in row)
@@ -88,12 +131,22 @@ class ConnectFour:
         for row in reversed(range(self.rows)):
             if self.board[row][col] == EMPTY:
                 self.board[row][col] = player
+                self.hash ^= self.piece_keys[row][col][player]
+                if self.symmetry:
+                    self.mirror_hash ^= self.mirror_keys[row][col][player]
+                if self.evaluator is not None:
+                    self.evaluator.place(row, col, player)
                 return True
         return False
 
     def undo_move(self, col):
         for row in range(self.rows):
             if self.board[row][col] != EMPTY:
+                self.hash ^= self.piece_keys[row][col][self.board[row][col]]
+                if self.symmetry:
+                    self.mirror_hash ^= self.mirror_keys[row][col][self.board[row][col]]
+                if self.evaluator is not None:
+                    self.evaluator.remove(row, col, self.board[row][col])
                 self.board[row][col] = EMPTY
                 return True
         return False
@@ -133,3 +186,160 @@ class ConnectFour:
             return False if maximizing_player else True
         else:
             return None
+
+
+def has_four(mask, height):
+    # shift-and-AND over the four line directions (vertical, horizontal, both diagonals)
+    for shift in (1, height, height - 1, height + 1):
+        pairs = mask & (mask >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+class BitboardConnectFour(ConnectFour):
+    # same contract as ConnectFour, but the board lives in two integer masks:
+    # bit (col * (rows + 1) + r) is the cell r rows above the bottom of col,
+    # with one sentinel bit on top of each column so shifts never wrap
+    def __init__(self, initial_state, game_size, symmetry=False):
+        self.player1_mask = 0
+        self.player2_mask = 0
+        super().__init__(initial_state, game_size, symmetry)
+
+    def init_piece_keys(self):
+        # indexed by bit position (sentinel bits get keys too, they are never set)
+        return player_keys('connectfour-bitboard', self.cols * (self.rows + 1))
+
+    def init_mirror_keys(self):
+        height = self.rows + 1
+        return [self.piece_keys[(self.cols - 1 - bit // height) * height + bit % height]
+                for bit in range(self.cols * height)]
+
+    def compute_hash(self, keys=None):
+        keys = keys or self.piece_keys
+        key = 0
+        for bit in range(self.cols * self.height):
+            if self.player1_mask >> bit & 1:
+                key ^= keys[bit][PLAYER1]
+            elif self.player2_mask >> bit & 1:
+                key ^= keys[bit][PLAYER2]
+        return key
+
+    @property
+    def board(self):
+        # list-of-lists view (top row first), only built for display and the heuristic
+        board = [[EMPTY for _ in range(self.cols)] for _ in range(self.rows)]
+        for col in range(self.cols):
+            for r in range(self.rows):
+                bit = 1 << (col * self.height + r)
+                if self.player1_mask & bit:
+                    board[self.rows - 1 - r][col] = PLAYER1
+                elif self.player2_mask & bit:
+                    board[self.rows - 1 - r][col] = PLAYER2
+        return board
+
+    @board.setter
+    def board(self, board):
+        self.load_board(board)
+
+    def load_board(self, board):
+        self.height = self.rows + 1
+        self.player1_mask = 0
+        self.player2_mask = 0
+        self.heights = [col * self.height for col in range(self.cols)]
+        self.tops = [col * self.height + self.rows for col in range(self.cols)]
+        self.filled = 0
+        for col in range(self.cols):
+            for r in range(self.rows):
+                cell = board[self.rows - 1 - r][col]
+                if cell == EMPTY:
+                    break
+                bit = 1 << (col * self.height + r)
+                if cell == PLAYER1:
+                    self.player1_mask |= bit
+                else:
+                    self.player2_mask |= bit
+                self.heights[col] += 1
+                self.filled += 1
+
+        # winner so far (random boards may already contain a four-in-a-row)
+        if has_four(self.player1_mask, self.height):
+            self.winner = PLAYER1
+        elif has_four(self.player2_mask, self.height):
+            self.winner = PLAYER2
+        else:
+            self.winner = None
+        self.winner_history = []
+        self.hash = self.compute_hash()
+        self.mirror_hash = self.compute_hash(self.mirror_keys)
+
+    def get_state_key(self, maximizingPlayer):
+        return (maximizingPlayer, self.player1_mask, self.player2_mask)
+
+    def get_valid_moves(self):
+        return [col for col in range(self.cols) if self.heights[col] < self.tops[col]]
+
+    def make_move(self, col, player):
+        if self.heights[col] >= self.tops[col]:
+            return False
+        bit = 1 << self.heights[col]
+        self.hash ^= self.piece_keys[self.heights[col]][player]
+        if self.symmetry:
+            self.mirror_hash ^= self.mirror_keys[self.heights[col]][player]
+        if self.evaluator is not None:
+            self.evaluator.place(self.tops[col] - 1 - self.heights[col], col, player)
+        self.heights[col] += 1
+        self.filled += 1
+        self.winner_history.append(self.winner)
+
+        # only the player who just moved can have completed a four
+        if player == PLAYER1:
+            self.player1_mask |= bit
+            if self.winner is None and has_four(self.player1_mask, self.height):
+                self.winner = PLAYER1
+        else:
+            self.player2_mask |= bit
+            if self.winner is None and has_four(self.player2_mask, self.height):
+                self.winner = PLAYER2
+        return True
+
+    def undo_move(self, col):
+        if self.heights[col] == col * self.height:
+            return False
+        self.heights[col] -= 1
+        self.filled -= 1
+        bit = 1 << self.heights[col]
+        player = PLAYER1 if self.player1_mask & bit else PLAYER2
+        self.hash ^= self.piece_keys[self.heights[col]][player]
+        if self.symmetry:
+            self.mirror_hash ^= self.mirror_keys[self.heights[col]][player]
+        if self.evaluator is not None:
+            self.evaluator.remove(self.tops[col] - 1 - self.heights[col], col, player)
+        clear = ~bit
+        self.player1_mask &= clear
+        self.player2_mask &= clear
+        if self.winner_history:
+            self.winner = self.winner_history.pop()
+        elif has_four(self.player1_mask, self.height):
+            self.winner = PLAYER1
+        elif has_four(self.player2_mask, self.height):
+            self.winner = PLAYER2
+        else:
+            self.winner = None
+        return True
+
+    def is_full(self):
+        return self.filled == self.rows * self.cols
+
+    def check_win(self, player):
+        return self.winner == player
+
+    def is_terminal_node(self):
+        return self.winner is not None or self.filled == self.rows * self.cols
+
+    def get_winner(self, maximizing_player):
+        if self.winner == PLAYER1:
+            return True if maximizing_player else False
+        elif self.winner == PLAYER2:
+            return False if maximizing_player else True
+        else:
+            return None
@@ -1,12 +1,38 @@
 import random
+from zobrist import zobrist_keys, player_keys, side_to_move
 
 EMPTY = 0
 PLAYER1 = 1
 PLAYER2 = -1 
 
+def square_symmetries(n):
+    # the 7 non-identity rotations/reflections of an (n + 1) x (n + 1) grid of dots
+    return [lambda r, c: (c, n - r), lambda r, c: (n - r, n - c), lambda r, c: (n - c, r),
+            lambda r, c: (r, n - c), lambda r, c: (n - r, c), lambda r, c: (c, r),
+            lambda r, c: (n - c, n - r)]
+
+def transform_line(line, transform):
+    line_type, i, j = line
+    a = transform(i, j)
+    b = transform(i, j + 1) if line_type == 'h' else transform(i + 1, j)
+    if a[0] == b[0]:
+        return ('h', a[0], min(a[1], b[1]))
+    return ('v', min(a[0], b[0]), a[1])
+
+def transform_box(box, transform):
+    a = transform(*box)
+    b = transform(box[0] + 1, box[1] + 1)
+    return (min(a[0], b[0]), min(a[1], b[1]))
+
 class DotsAndBoxes:
-    def __init__(self, initial_state, game_size):
+    # extra_turn: completing a box means moving again (the real rules)
+    # macro_moves: the search moves in macro moves (see get_macro_moves), implies extra_turn
+    # symmetry: also keep the hashes of the 7 rotated/reflected boards, so they share one canonical key
+    def __init__(self, initial_state, game_size, extra_turn=False, macro_moves=False, symmetry=False):
         self.initial = initial_state 
+        self.extra_turn = extra_turn or macro_moves
+        self.macro_moves = macro_moves
+        self.symmetry = symmetry
         self.size = 2
         if(game_size == 'medium'):
             self.size = 3
@@ -16,8 +42,18 @@ class DotsAndBoxes:
         self.v_lines = [[0] * (self.size + 1) for _ in range(self.size)]
         self.boxes = [[0] * self.size for _ in range(self.size)]
         self.current_player = PLAYER1
+        # running counters: filled lines, and boxes owned indexed by player (box_count[-1] is PLAYER2's)
+        self.total_lines = 2 * self.size * (self.size + 1)
+        self.filled_lines = 0
+        self.box_count = [0, 0, 0]
+        # filled lines as bits: h lines row by row, then v lines (the tablebase index)
+        self.line_mask = 0
+        self.init_keys()
+        self.hash = 0
         if not self.initial:
             self.randomize_lines()
+        self.hash = self.compute_hash()
+        self.symmetric_hashes = self.compute_symmetric_hashes()
 
     def get_state_key(self, maximizingPlayer):
         h_lines_key = tuple(tuple(row) for row in self.h_lines)
@@ -26,6 +62,91 @@ class DotsAndBoxes:
         # transposition table value includes player and board configuration 
         return (maximizingPlayer, self.current_player, h_lines_key, v_lines_key, boxes_key)
 
+    def get_hash(self, maximizingPlayer):
+        return side_to_move(self.hash, maximizingPlayer)
+
+    def init_keys(self):
+        size = self.size
+        h_keys = player_keys('dotsandboxes-h', (size + 1) * size)
+        v_keys = player_keys('dotsandboxes-v', size * (size + 1))
+        box_keys = player_keys('dotsandboxes-box', size * size)
+        self.h_keys = [h_keys[i * size:(i + 1) * size] for i in range(size + 1)]
+        self.v_keys = [v_keys[i * (size + 1):(i + 1) * (size + 1)] for i in range(size)]
+        self.box_keys = [box_keys[i * size:(i + 1) * size] for i in range(size)]
+        # toggled whenever current_player changes (it is part of the state key)
+        self.player_key = zobrist_keys('dotsandboxes-player', 1)[0]
+
+        # per line/box: its key in each transformed board, and the line maps in and out of each frame
+        transforms = square_symmetries(size)
+        lines = [('h', i, j) for i in range(size + 1) for j in range(size)] + \
+                [('v', i, j) for i in range(size) for j in range(size + 1)]
+        self.line_maps = [{line: transform_line(line, t) for line in lines} for t in transforms]
+        self.inverse_line_maps = [{image: line for line, image in line_map.items()} for line_map in self.line_maps]
+        self.symmetric_line_keys = {line: [self.line_keys(line_map[line]) for line_map in self.line_maps] for line in lines}
+        self.symmetric_box_keys = {(r, c): [self.box_keys[br][bc] for br, bc in (transform_box((r, c), t) for t in transforms)]
+                                   for r in range(size) for c in range(size)}
+
+    def line_keys(self, line):
+        line_type, i, j = line
+        return (self.h_keys if line_type == 'h' else self.v_keys)[i][j]
+
+    def compute_symmetric_hashes(self):
+        hashes = []
+        for t in range(len(self.line_maps)):
+            key = 0 if self.current_player == PLAYER1 else self.player_key
+            for line, keys in self.symmetric_line_keys.items():
+                line_type, i, j = line
+                owner = (self.h_lines if line_type == 'h' else self.v_lines)[i][j]
+                if owner != 0:
+                    key ^= keys[t][owner]
+            for (r, c), keys in self.symmetric_box_keys.items():
+                if self.boxes[r][c] != 0:
+                    key ^= keys[t][self.boxes[r][c]]
+            hashes.append(key)
+        return hashes
+
+    def get_canonical_hash(self, maximizingPlayer):
+        # (key, frame): the smallest of the 8 symmetric hashes; frame 0 is the board as it is,
+        # frame t the board under the t-th entry of line_maps
+        key = self.hash
+        frame = 0
+        for t, symmetric_hash in enumerate(self.symmetric_hashes, 1):
+            if symmetric_hash < key:
+                key = symmetric_hash
+                frame = t
+        return side_to_move(key, maximizingPlayer), frame
+
+    def to_canonical_move(self, move, frame):
+        if not frame:
+            return move
+        line_map = self.line_maps[frame - 1]
+        if self.macro_moves:
+            return tuple(line_map[line] for line in move)
+        return line_map[move]
+
+    def from_canonical_move(self, move, frame):
+        if not frame:
+            return move
+        line_map = self.inverse_line_maps[frame - 1]
+        if self.macro_moves:
+            return tuple(line_map[line] for line in move)
+        return line_map[move]
+
+    def toggle_symmetric(self, keys, player):
+        # xors a line's or box's keys into the transformed boards' hashes
+        hashes = self.symmetric_hashes
+        for t in range(len(hashes)):
+            hashes[t] ^= keys[t][player]
+
+    def compute_hash(self):
+        key = 0 if self.current_player == PLAYER1 else self.player_key
+        for lines, keys in ((self.h_lines, self.h_keys), (self.v_lines, self.v_keys), (self.boxes, self.box_keys)):
+            for i in range(len(lines)):
+                for j in range(len(lines[i])):
+                    if lines[i][j] != 0:
+                        key ^= keys[i][j][lines[i][j]]
+        return key
+
     def display_board(self):
         print("\nCurrent Board:")
         size = self.size
@@ -72,32 +193,83 @@ class DotsAndBoxes:
                     moves.append(('v', i, j))
         return moves
 
+    def adjacent_boxes(self, move):
+        # the (one or two) boxes bordered by a line
+        line_type, i, j = move
+        if line_type == 'h':
+            boxes = ((i - 1, j), (i, j))
+        else:
+            boxes = ((i, j - 1), (i, j))
+        size = self.size
+        return [(r, c) for r, c in boxes if 0 <= r < size and 0 <= c < size]
+
+    def is_box_complete(self, r, c):
+        return (self.h_lines[r][c] != 0 and self.h_lines[r + 1][c] != 0 and
+                self.v_lines[r][c] != 0 and self.v_lines[r][c + 1] != 0)
+
     def make_move(self, move):
+        # returns the number of boxes the move completed
         line_type, i, j = move
+        player = self.current_player
         if line_type == 'h':
-            self.h_lines[i][j] = self.current_player
+            self.h_lines[i][j] = player
+            self.hash ^= self.h_keys[i][j][player]
+            self.line_mask |= 1 << (i * self.size + j)
         else:
-            self.v_lines[i][j] = self.current_player
-        self.update_boxes()
+            self.v_lines[i][j] = player
+            self.hash ^= self.v_keys[i][j][player]
+            self.line_mask |= 1 << ((self.size + 1) * self.size + i * (self.size + 1) + j)
+        if self.symmetry:
+            self.toggle_symmetric(self.symmetric_line_keys[move], player)
+        self.filled_lines += 1
+
+        # only the boxes next to the new line can have been completed by it
+        completed = 0
+        for r, c in self.adjacent_boxes(move):
+            if self.boxes[r][c] == 0 and self.is_box_complete(r, c):
+                self.boxes[r][c] = player
+                self.hash ^= self.box_keys[r][c][player]
+                if self.symmetry:
+                    self.toggle_symmetric(self.symmetric_box_keys[(r, c)], player)
+                completed += 1
+        self.box_count[player] += completed
+        return completed
 
     def undo_move(self, move):
         line_type, i, j = move
         if line_type == 'h':
+            player = self.h_lines[i][j]
+            self.hash ^= self.h_keys[i][j][player]
             self.h_lines[i][j] = 0
+            self.line_mask &= ~(1 << (i * self.size + j))
         else:
+            player = self.v_lines[i][j]
+            self.hash ^= self.v_keys[i][j][player]
             self.v_lines[i][j] = 0
-        self.revert_boxes()
+            self.line_mask &= ~(1 << ((self.size + 1) * self.size + i * (self.size + 1) + j))
+        if self.symmetry:
+            self.toggle_symmetric(self.symmetric_line_keys[move], player)
+        self.filled_lines -= 1
+
+        # boxes next to the removed line are no longer complete
+        for r, c in self.adjacent_boxes(move):
+            owner = self.boxes[r][c]
+            if owner != 0:
+                self.hash ^= self.box_keys[r][c][owner]
+                if self.symmetry:
+                    self.toggle_symmetric(self.symmetric_box_keys[(r, c)], owner)
+                self.boxes[r][c] = 0
+                self.box_count[owner] -= 1
 
     def update_boxes(self):
+        # full scan, only used when setting up a board
         size = self.size
         for i in range(size):
             for j in range(size):
-                if self.boxes[i][j] == 0:
-                    if (self.h_lines[i][j] != 0 and 
-                        self.h_lines[i + 1][j] != 0 and 
-                        self.v_lines[i][j] != 0 and 
-                        self.v_lines[i][j + 1] != 0):
-                        self.boxes[i][j] = self.current_player
+                if self.boxes[i][j] == 0 and self.is_box_complete(i, j):
+                    self.boxes[i][j] = self.current_player
+                    self.hash ^= self.box_keys[i][j][self.current_player]
+                    self.box_count[self.current_player] += 1
 
     def randomize_lines(self):
         total_lines = (len(self.h_lines) * len(self.h_lines[0])) + (len(self.v_lines) * len(self.v_lines[0]))
@@ -114,36 +286,143 @@ class DotsAndBoxes:
             for j in range(len(self.v_lines[i])):
                 self.v_lines[i][j] = moves.pop()
 
+        # one third of the lines go to each player, the rest stay empty
+        self.filled_lines = 2 * one_third
+        self.line_mask = self.compute_line_mask()
         self.update_boxes()
 
-    def revert_boxes(self):
-        # recompute owned boxes to see if undoing move changed ownership
-        size = self.size
-        for i in range(size):
-            for j in range(size):
-                if self.boxes[i][j] != 0:
-                    if not (self.h_lines[i][j] != 0 and 
-                            self.h_lines[i + 1][j] != 0 and 
-                            self.v_lines[i][j] != 0 and 
-                            self.v_lines[i][j + 1] != 0):
-                        self.boxes[i][j] = 0
+    def compute_line_mask(self):
+        mask = 0
+        for bit, owner in enumerate([owner for row in self.h_lines for owner in row] +
+                                    [owner for row in self.v_lines for owner in row]):
+            if owner != 0:
+                mask |= 1 << bit
+        return mask
 
     def is_terminal_node(self):
         # all lines filled ==> terminal board configuration
-        return (all(all(cell != 0 for cell in row) for row in self.h_lines) and
-                all(all(cell != 0 for cell in row) for row in self.v_lines))
+        return self.filled_lines == self.total_lines
 
     def get_winner(self, maximizing_player):
-        player1_score = sum(row.count(PLAYER1) for row in self.boxes)
-        player2_score = sum(row.count(PLAYER2) for row in self.boxes)
-        if self.is_terminal_node():
-            if player1_score > player2_score:
-                return True if maximizing_player else False
-            elif player2_score > player1_score:
-                return False if maximizing_player else True
-            else:
-                return None
+        if self.filled_lines != self.total_lines:
+            return None
+        player1_score = self.box_count[PLAYER1]
+        player2_score = self.box_count[PLAYER2]
+        if player1_score > player2_score:
+            return True if maximizing_player else False
+        elif player2_score > player1_score:
+            return False if maximizing_player else True
+        else:
+            return None
+
+    def box_sides(self, r, c):
+        return ((self.h_lines[r][c] != 0) + (self.h_lines[r + 1][c] != 0) +
+                (self.v_lines[r][c] != 0) + (self.v_lines[r][c + 1] != 0))
+
+    def box_lines(self, r, c):
+        return (('h', r, c), ('h', r + 1, c), ('v', r, c), ('v', r, c + 1))
+
+    def is_line_empty(self, line):
+        line_type, i, j = line
+        return (self.h_lines if line_type == 'h' else self.v_lines)[i][j] == 0
+
+    def find_capture(self, last_line=None):
+        # empty line completing a box; the boxes next to the last capture come first so that
+        # chains are taken end to end
+        size = self.size
+        boxes = self.adjacent_boxes(last_line) if last_line is not None else []
+        for r, c in boxes + [(r, c) for r in range(size) for c in range(size)]:
+            if self.boxes[r][c] == 0 and self.box_sides(r, c) == 3:
+                for line in self.box_lines(r, c):
+                    if self.is_line_empty(line):
+                        return line
         return None
 
+    def chains(self):
+        # boxes with exactly two sides, grouped into chains/loops through their empty sides;
+        # returns box -> (chain id, chain length)
+        size = self.size
+        chain_of = {}
+        for r in range(size):
+            for c in range(size):
+                if (r, c) in chain_of or self.boxes[r][c] != 0 or self.box_sides(r, c) != 2:
+                    continue
+                chain = [(r, c)]
+                seen = {(r, c)}
+                for box in chain:
+                    for line in self.box_lines(*box):
+                        if not self.is_line_empty(line):
+                            continue
+                        for other in self.adjacent_boxes(line):
+                            if other not in seen and self.box_sides(*other) == 2:
+                                seen.add(other)
+                                chain.append(other)
+                for box in chain:
+                    chain_of[box] = ((r, c), len(chain))
+        return chain_of
+
+    def get_macro_moves(self):
+        # with extra turns, a turn is: every capture available (greedily, chain by chain), then one
+        # line that completes nothing. each macro move is the tuple of lines of one whole turn:
+        #   - all captures + each safe line (one that gives no box a third side)
+        #   - all captures + one line per long chain (3+ boxes) or loop handed over, every line of
+        #     shorter chains (the half-hearted/hard-hearted handouts differ)
+        #   - double-deal: all captures but the last two, then the line that hands both boxes
+        #     back with one stroke
+        # so the turn always passes and the search can alternate sides as usual
+        captures = []
+        completed = []
+        line = self.find_capture()
+        while line is not None:
+            completed.append(self.make_move(line))
+            captures.append(line)
+            line = self.find_capture(line)
+
+        macro_moves = []
+        remaining = self.get_valid_moves()
+        if not remaining:
+            macro_moves.append(tuple(captures))
+        else:
+            chain_of = self.chains()
+            offered = set()
+            for line in remaining:
+                chains = {chain_of[box] for box in self.adjacent_boxes(line) if box in chain_of}
+                if any(length >= 3 for _, length in chains):
+                    group = frozenset(chains)
+                    if group in offered:
+                        continue
+                    offered.add(group)
+                macro_moves.append(tuple(captures) + (line,))
+
+        for line in reversed(captures):
+            self.undo_move(line)
+
+        # double-deal, only where the last two captures took one box each of the same chain
+        if len(captures) >= 2 and completed[-2] == completed[-1] == 1:
+            for line in captures[:-2]:
+                self.make_move(line)
+            if self.make_move(captures[-1]) == 0 and len(self.adjacent_boxes(captures[-2])) == 2 and \
+               all(self.box_sides(r, c) == 3 for r, c in self.adjacent_boxes(captures[-2])):
+                macro_moves.append(tuple(captures[:-2]) + (captures[-1],))
+            self.undo_move(captures[-1])
+            for line in reversed(captures[:-2]):
+                self.undo_move(line)
+        return macro_moves
+
+    def make_macro_move(self, macro_move):
+        # plays every line of the turn for the current player; returns the boxes completed
+        completed = 0
+        for line in macro_move:
+            completed += self.make_move(line)
+        return completed
+
+    def undo_macro_move(self, macro_move):
+        for line in reversed(macro_move):
+            self.undo_move(line)
+
     def set_current_player(self, player):
+        if player != self.current_player:
+            self.hash ^= self.player_key
+            if self.symmetry:
+                self.symmetric_hashes = [key ^ self.player_key for key in self.symmetric_hashes]
         self.current_player = player
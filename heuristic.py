@@ -1,6 +1,7 @@
 from connectfour import ConnectFour, PLAYER1, PLAYER2, EMPTY
 from nim import Nim
 from dotsandboxes import DotsAndBoxes
+from scores import KNOWN_WIN
 
 def evaluate(game, maximizing_player):
     if isinstance(game, Nim):
@@ -9,6 +10,8 @@ def evaluate(game, maximizing_player):
         return evaluate_dots_and_boxes(game, maximizing_player)
     elif isinstance(game, ConnectFour):
         player = PLAYER1 if maximizing_player else PLAYER2
+        if game.evaluator is not None:
+            return game.evaluator.score(player)
         return evaluate_connect_four(game, player)
     else:
         return 0
@@ -18,41 +21,43 @@ def evaluate_nim(game, maximizing_player):
     for heap in game.heaps:
         nimber ^= heap
     if nimber == 0:
-        return float('-inf') if maximizing_player else float('inf')
+        return -KNOWN_WIN if maximizing_player else KNOWN_WIN
     else:
-        return float('inf') if maximizing_player else float('-inf')
+        return KNOWN_WIN if maximizing_player else -KNOWN_WIN
 
 def evaluate_dots_and_boxes(game, maximizing_player):
-    player1_score = sum(row.count(1) for row in game.boxes)
-    player2_score = sum(row.count(-1) for row in game.boxes)
+    player1_score = game.box_count[PLAYER1]
+    player2_score = game.box_count[PLAYER2]
     return (player1_score - player2_score) if maximizing_player else (player2_score - player1_score)
 
 def evaluate_connect_four(game, player):
     score = 0
+    # bind once (BitboardConnectFour builds this view on every access)
+    board = game.board
 
-    center_array = [game.board[i][game.cols // 2] for i in range(game.rows)]
+    center_array = [board[i][game.cols // 2] for i in range(game.rows)]
     center_count = center_array.count(player)
     score += center_count * 3
 
     for row in range(game.rows):
-        row_array = game.board[row]
+        row_array = board[row]
         for col in range(game.cols - 3):
             window = row_array[col:col + 4]
             score += evaluate_window(window, player)
 
     for col in range(game.cols):
-        col_array = [game.board[row][col] for row in range(game.rows)]
+        col_array = [board[row][col] for row in range(game.rows)]
         for row in range(game.rows - 3):
             window = col_array[row:row + 4]
             score += evaluate_window(window, player)
 
     for row in range(game.rows - 3):
         for col in range(game.cols - 3):
-            window = [game.board[row + i][col + i] for i in range(4)]
+            window = [board[row + i][col + i] for i in range(4)]
             score += evaluate_window(window, player)
     for row in range(3, game.rows):
         for col in range(game.cols - 3):
-            window = [game.board[row - i][col + i] for i in range(4)]
+            window = [board[row - i][col + i] for i in range(4)]
             score += evaluate_window(window, player)
 
     return score
@@ -0,0 +1,67 @@
+import copy
+import time
+from alphabeta import alphabeta
+from negamax import game_protocol
+from searchstats import SearchStats
+from scores import INF, is_mate
+
+# depth cap when only a time/node budget is given
+MAX_ITERATIONS = 64
+
+class SearchTimeout(Exception):
+    pass
+
+class BudgetCounter(SearchStats):
+    # search stats that abort the search once the node or time budget is spent
+    def __init__(self, node_limit=None, deadline=None, enabled=False):
+        self.node_limit = node_limit
+        self.deadline = deadline
+        super().__init__(enabled)
+
+    @property
+    def nodes(self):
+        return self.count
+
+    @nodes.setter
+    def nodes(self, value):
+        self.count = value
+        if self.node_limit is not None and value > self.node_limit:
+            raise SearchTimeout
+        # clock is only read every 256 nodes
+        if self.deadline is not None and value & 255 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+def iterative_deepening(game, game_size, maximizingPlayer, node_counter, tt, search=alphabeta,
+                        max_depth=MAX_ITERATIONS, time_limit=None, node_limit=None, orderer=None):
+    # searches depth 1, 2, ... until the budget runs out; returns the best move and value of the
+    # deepest completed iteration. tt and orderer (if specified) carry best moves, killers and history
+    # from one iteration to the next
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    counter = BudgetCounter(node_limit, deadline, node_counter.enabled)
+
+    valid_moves = game_protocol(game, game_size).moves()
+    best_move = valid_moves[0] if valid_moves else None
+    best_value = None
+    completed_depth = 0
+
+    for depth in range(1, max_depth + 1):
+        if tt is not None:
+            tt.new_search()
+        # an aborted search leaves moves applied, so each iteration runs on its own copy
+        search_game = copy.deepcopy(game)
+        try:
+            move, value = search(search_game, depth, game_size, -INF, INF, maximizingPlayer, counter, tt, orderer)
+        except SearchTimeout:
+            break
+        if move is not None:
+            best_move = move
+        best_value = value
+        completed_depth = depth
+
+        # proven win/loss (a terminal position, or an exact leaf: nim solver, tablebase) within this depth:
+        # deeper iterations can't change the answer. heuristic verdicts stay below the mate band (see scores)
+        if is_mate(value):
+            break
+
+    node_counter.merge(counter)
+    return best_move, best_value, completed_depth
@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import random
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from alphabeta import alphabeta
+from moveordering import MoveOrderer
+from searchstats import SearchStats
+from transpositiontable import EXACT, LOWERBOUND, UPPERBOUND, MASK64, MOVE_NONE, encode_move, decode_move
+from scores import INF, within_depth, score_at_ply, score_from_ply
+
+# slot = two little-endian 64-bit words: (key ^ data, data). a torn write from another process
+# breaks key ^ data, so it reads as a miss instead of a wrong entry
+SLOT = struct.Struct('<QQ')
+VALID = 1 << 7
+# values are 32-bit ints (scores fit, see scores), stored with an offset
+VALUE_OFFSET = 1 << 31
+
+def pack_entry(depth, value, best_move, flag):
+    code = encode_move(best_move)
+    if code is None:
+        code = MOVE_NONE
+    return ((value + VALUE_OFFSET) << 32) | (code << 16) | (max(0, min(depth, 255)) << 8) | VALID | flag
+
+def unpack_entry(data):
+    return (data >> 8) & 0xFF, (data >> 32) - VALUE_OFFSET, decode_move((data >> 16) & 0xFFFF), data & 0x3
+
+class SharedTranspositionTable:
+    # fixed-slot table in shared memory, usable from several processes at once without locks;
+    # same interface as TranspositionTable (alpha-beta and minimax entries share the slots, minimax
+    # lookups only accept EXACT entries)
+    def __init__(self, memory_mb=64, name=None):
+        if name is None:
+            slots = max(1, int(memory_mb * 1024 * 1024) // SLOT.size)
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * SLOT.size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.buffer = self.shm.buf
+        self.slots = self.shm.size // SLOT.size
+        self.hits = 0
+        self.misses = 0
+        self.cutoffs = [0, 0, 0]
+        self.collisions = 0
+        self.overwrites = 0
+
+    def close(self):
+        self.buffer = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def new_search(self):
+        pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'collisions': self.collisions,
+                'overwrites': self.overwrites, 'entries': None}
+
+    def probe(self, state_key):
+        key = state_key & MASK64
+        check, data = SLOT.unpack_from(self.buffer, (key % self.slots) * SLOT.size)
+        if data and check ^ data == key:
+            self.hits += 1
+            return unpack_entry(data)
+        if data:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, state_key, depth, value, best_move, flag):
+        key = state_key & MASK64
+        offset = (key % self.slots) * SLOT.size
+        check, stored = SLOT.unpack_from(self.buffer, offset)
+        # depth-preferred, except that the same position is always refreshed
+        if stored and check ^ stored != key:
+            if (stored >> 8) & 0xFF > depth:
+                return
+            self.overwrites += 1
+        data = pack_entry(depth, value, best_move, flag)
+        SLOT.pack_into(self.buffer, offset, key ^ data, data)
+
+    def ab_lookup(self, state_key, depth, alpha, beta, ply=0):
+        entry = self.probe(state_key)
+        if entry is None:
+            return False, None, None
+        stored_depth, value, best_move, flag = entry
+        if stored_depth < depth or not within_depth(value, depth):
+            return False, best_move, None
+        value = score_at_ply(value, ply)
+        if flag == EXACT or (flag == LOWERBOUND and max(alpha, value) >= beta) or (flag == UPPERBOUND and alpha >= min(beta, value)):
+            self.cutoffs[flag] += 1
+            return True, best_move, value
+        return False, best_move, None
+
+    def ab_store(self, state_key, depth, value, best_move, flag, alpha, beta, ply=0):
+        self.store(state_key, depth, score_from_ply(value, ply), best_move, flag)
+
+    def mm_lookup(self, state_key, depth, ply=0):
+        entry = self.probe(state_key)
+        if entry is None:
+            return False, None, None
+        stored_depth, value, best_move, flag = entry
+        if stored_depth >= depth and flag == EXACT and within_depth(value, depth):
+            self.cutoffs[EXACT] += 1
+            return True, best_move, score_at_ply(value, ply)
+        return False, None, None
+
+    def mm_store(self, state_key, depth, value, best_move, ply=0):
+        self.store(state_key, depth, score_from_ply(value, ply), best_move, EXACT)
+
+class SearchStopped(Exception):
+    pass
+
+class StopCounter(SearchStats):
+    # search stats for helper processes: aborts once the main search has finished
+    def __init__(self, stop):
+        self.stop = stop
+        super().__init__()
+
+    @property
+    def nodes(self):
+        return self.count
+
+    @nodes.setter
+    def nodes(self, value):
+        self.count = value
+        # not on the reset in __init__, which runs outside the helper's try (it may start after the main search ended)
+        if value and value & 255 == 0 and self.stop.value:
+            raise SearchStopped
+
+class ShuffledOrderer(MoveOrderer):
+    # helper threads break ordering ties differently so they explore different parts of the tree first
+    def __init__(self, seed):
+        super().__init__()
+        self.rng = random.Random(seed)
+
+    def order(self, game, valid_moves, depth, tt_move=None):
+        valid_moves = list(valid_moves)
+        self.rng.shuffle(valid_moves)
+        return super().order(game, valid_moves, depth, tt_move)
+
+stop_flag = None
+
+def init_helper(stop):
+    global stop_flag
+    stop_flag = stop
+
+def helper_search(game, depth, game_size, maximizingPlayer, search, table_name, helper_index):
+    # iterative deepening up to depth (+1 for every other helper), feeding the shared table
+    tt = SharedTranspositionTable(name=table_name)
+    node_counter = StopCounter(stop_flag)
+    orderer = ShuffledOrderer(helper_index)
+    try:
+        for d in range(1, depth + 1 + helper_index % 2):
+            search(game, d, game_size, -INF, INF, maximizingPlayer, node_counter, tt, orderer)
+    except SearchStopped:
+        pass
+    finally:
+        tt.close()
+    return node_counter.nodes
+
+def lazy_smp_search(game, depth, game_size, maximizingPlayer, node_counter, search=alphabeta,
+                    threads=None, memory_mb=64, orderer=None):
+    # the main search runs here, iteratively deepening to depth, while threads - 1 helper processes
+    # search the same position (different move orders, some one ply deeper) into one shared table;
+    # the answer is the main search's, node counts include the helpers
+    threads = threads or os.cpu_count()
+    tt = SharedTranspositionTable(memory_mb)
+    stop = multiprocessing.Value('b', 0)
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, threads - 1), initializer=init_helper, initargs=(stop,)) as pool:
+            helpers = [pool.submit(helper_search, game, depth, game_size, maximizingPlayer, search, tt.name, i)
+                       for i in range(1, threads)]
+            for d in range(1, depth + 1):
+                best_move, value = search(game, d, game_size, -INF, INF, maximizingPlayer, node_counter, tt, orderer)
+            stop.value = 1
+            for helper in helpers:
+                node_counter.nodes += helper.result()
+        stats = tt.stats()
+    finally:
+        tt.close()
+    return best_move, value, stats
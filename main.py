@@ -8,7 +8,8 @@ Group Members:
 
 How to Run the Test Script
     1. run "make" in terminal
-    2. Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]
+    2. Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5/cmp6]
+       prints the agent's result as one json line; add --compare for the minimax comparison
 
 Brief Description of Final Project
     Our final project compares the performance of a minimax algorithm using 5 different comparison agents, which are combinations of
@@ -24,10 +25,12 @@ What Our Code Does
     5. scout: alpha-beta pruning variant that uses full-window and null-window searches to re-evaluate moves
     6. game representations: connectfour, nim, and dotsandboxes rules, board/state configurations, and terminal conditions, and player-turn based actions
     7. heuristic: incentivize and label intermediate states with arbitrary increments (similar to pegging policies)
+       scores are integers; a forced win in n plies scores WIN - n (scores.py), so faster wins are preferred
     8. node counter and time measurement implementation to interpret final results
 
-    PS. We randomly sample states for the large dotsandboxes case, since otherwise 
-    the current minimax algorithm runs for an unreasonable amount of time to compute the best move.
+    PS. The large dotsandboxes baseline is a budgeted selective search (best moves by heuristic, widening towards
+    the root, reproducible for a seed), since otherwise the current minimax algorithm runs for an unreasonable
+    amount of time to compute the best move.
 
 
 Research Question
@@ -65,134 +68,200 @@ Results
     Cmp3 and Cmp4 due to SCOUT's re-checking process. 
 """
 
+import json
 import time
 import sys
-from connectfour import ConnectFour
+from connectfour import ConnectFour, BitboardConnectFour
 from nim import Nim
 from dotsandboxes import DotsAndBoxes
 from minimax import minimax
-from alphabeta import alphabeta
-from scout import scout
-from transpositiontable import TranspositionTable 
-from sampling import minimax_sample 
+from selective import selective_search
+from agents import AGENTS, agent_settings, run_agent
+from searchstats import SearchStats
+
+USAGE = """Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5/cmp6] [options]
+Options:
+    --bitboard                                  connectfour on integer bitboards
+    --tt-mb=MB                                  bound the transposition table to MB megabytes
+    --tt-replace=depth|always|twotier|aging     replacement scheme of a bounded table
+    --tt-packed                                 store a bounded table in typed arrays
+    --time=SECONDS / --nodes=N                  iterative deepening within a time/node budget (cmp1/cmp2/cmp4/cmp5); cmp6: time only
+    --iterations=N                              cmp6: monte carlo tree search iterations (default 2000 without --time)
+    --selective                                 cmp1/cmp4 with --time/--nodes: selective search (beam, progressive widening, late-move reductions)
+    --beam=N|none                               selective: moves kept at the last ply (default 4, none = full width)
+    --seed=N                                    selective search / cmp6 seed (default 0)
+    --mtdf                                      cmp4: mtd(f), zero-window alpha-beta calls converging on the value, depth by depth
+    --aspiration[=W]                            cmp1/cmp4: windows of +-W (default 10) around the previous depth's value
+    --leaf-parallel                             cmp6 with --workers: parallel playouts of one tree instead of one tree per worker
+    --ordering                                  tt move, killer, history and game-prior move ordering (cmp1/cmp2/cmp4/cmp5)
+    --pvs                                       cmp2/cmp5 run principal variation search instead of scout
+    --workers=N                                 split the agent's root moves over N processes
+    --lazysmp=N                                 N processes search the same position through one shared-memory table (cmp4/cmp5)
+    --extra-turn                                dotsandboxes: completing a box means moving again (cmp2/cmp5 need --pvs)
+    --macro                                     dotsandboxes: extra turns, searched as whole-turn macro moves (cmp2/cmp5 need --pvs)
+    --symmetry                                  key the transposition table by the canonical symmetric position (cmp3/cmp4, cmp5 with --pvs)
+    --nim-solver=root|leaf                      nim: the agent answers from sprague-grundy tables, or scores its leaves with them
+    --tablebase=PATH                            the agent scores its leaves from an endgame tablebase (built with tablebase.py)
+    --book=PATH                                 warm the transposition table from (and save deep exact entries to) a sqlite book (cmp3/cmp4/cmp5)
+    --eval=incremental|vector                   connectfour: the agent's heuristic updated from each move's windows, or scored with numpy arrays
+    --batch-leaves[=D]                          evaluate the agent's leaves in vectorized batches: the frontier below depth D (default 2)
+                                                for minimax, the last ply for pruning searches (needs numpy; not the original scout)
+    --compare                                   also run the minimax baseline and print both searches and the improvement
+                                                (default: only the agent, its result printed as json)
+    --stats                                     with --compare: detailed search statistics (nodes per depth, leaves, evaluations, tt, cutoffs, re-searches)
+    --profile                                   with --compare: sample where the agent's time goes (move generation, make/undo, terminal checks, evaluate)"""
+
+# every option USAGE lists
+OPTIONS = {'bitboard', 'tt-mb', 'tt-replace', 'tt-packed', 'time', 'nodes', 'iterations', 'selective', 'beam', 'seed', 'mtdf',
+           'aspiration', 'leaf-parallel', 'ordering', 'pvs', 'workers', 'lazysmp', 'extra-turn', 'macro', 'symmetry',
+           'nim-solver', 'tablebase', 'book', 'eval', 'batch-leaves', 'compare', 'stats', 'profile'}
+
+def parse_options(args, known=OPTIONS, usage=USAGE):
+    # trailing --name or --name=value flags, each one of the known names (a typo prints the usage
+    # instead of running without the option)
+    options = {}
+    for arg in args:
+        name, _, value = arg[2:].partition('=')
+        if not arg.startswith('--') or name not in known:
+            print(usage)
+            sys.exit(1)
+        options[name] = value if value else True
+    return options
+
+def make_game(game_choice, game_size, state, options):
+    # the game (with its rule/key options) and the fixed search depth used for it
+    extra_turn = bool(options.get('extra-turn'))
+    macro_moves = bool(options.get('macro'))
+    symmetry = bool(options.get('symmetry'))
+    initial = state == 'initial'
+    if game_choice == 'connectfour':
+        # bitboard mode: integer masks + incremental win detection
+        connect_four = BitboardConnectFour if options.get('bitboard') else ConnectFour
+        return connect_four(initial, game_size, symmetry), 4
+    elif game_choice == 'nim':
+        return Nim(initial, game_size, symmetry=symmetry), 10
+    elif game_choice == 'dotsandboxes':
+        return DotsAndBoxes(initial, game_size, extra_turn, macro_moves, symmetry), 3 if initial else 6
+    raise ValueError(f"unknown game: {game_choice}")
+
+def coverage_line(coverage):
+    return (f"Coverage: depth {coverage['depth']}, {coverage['coverage']:.1%} of the legal moves at {coverage['expanded']} expanded nodes "
+            f"({coverage['reduced']} reduced, {coverage['researched']} re-searched)")
 
 def main():
     if len(sys.argv) < 5:
-        print("Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]")
+        print(USAGE)
         sys.exit(1)
 
     game_choice = sys.argv[1].lower().replace('_', '')
     if(game_choice not in ['connectfour', 'nim', 'dotsandboxes']):
-        print("Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]")
+        print(USAGE)
         sys.exit(1)
 
     game_size = sys.argv[2]
     if(game_size not in ['small', 'medium', 'large']):
-        print("Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]")
+        print(USAGE)
         sys.exit(1)
 
     state = sys.argv[3]
     if(state not in ['initial', 'random']):
-        print("Usage: ./FinalProj [connectfour|nim|dotsandboxes] [small/medium/large] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]")
+        print(USAGE)
         sys.exit(1)
 
     agent = sys.argv[4]
-    if(agent not in ['cmp1', 'cmp2', 'cmp3', 'cmp4', 'cmp5']):
-        print("Usage: ./FinalProj [connectfour|nim|dotsandboxes] [initial/random] [cmp1/cmp2/cmp3/cmp4/cmp5]")
+    if(agent not in AGENTS):
+        print(USAGE)
         sys.exit(1)
 
-    if(agent in ['cmp3', 'cmp4', 'cmp5']):
-        has_tt = True
-    else:
-        has_tt = False
-    
-    if game_choice == 'connectfour':
-        if(state == 'initial'):
-            game = ConnectFour(True, game_size)
-        elif (state == 'random'):
-            game = ConnectFour(False, game_size)
-        MAX_DEPTH = 4
-    elif game_choice == 'nim':
-        if(state == 'initial'):
-            game = Nim(True, game_size)
-        elif (state == 'random'):
-            game = Nim(False, game_size)
-        MAX_DEPTH = 10
-    elif game_choice == 'dotsandboxes':
-        if(state == 'initial'):
-            game = DotsAndBoxes(True, game_size)
-            MAX_DEPTH = 3
-        elif (state == 'random'):
-            game = DotsAndBoxes(False, game_size)
-            MAX_DEPTH = 6
+    options = parse_options(sys.argv[5:])
+    # every agent option is checked before anything runs (see agents.agent_settings)
+    try:
+        agent_settings(game_choice, agent, options)
+    except ValueError:
+        print(USAGE)
+        sys.exit(1)
+    # by default only the agent runs and its result is one json line; the minimax comparison (and its
+    # detailed summaries) is opt-in
+    compare = bool(options.get('compare'))
+    if not compare and (options.get('stats') or options.get('profile')):
+        print(USAGE)
+        sys.exit(1)
+
+    game, MAX_DEPTH = make_game(game_choice, game_size, state, options)
+
+    if not compare:
+        result = run_agent(game, MAX_DEPTH, game_size, agent, options)
+        print(json.dumps(result.as_dict(), default=str))
+        return
 
     game.display_board()
 
-    node_counter_minimax = {'nodes': 0}
-    node_counter_agent = {'nodes': 0}
+    # detailed counters only on request, plain node counts otherwise
+    detailed = bool(options.get('stats'))
+    node_counter_minimax = SearchStats(detailed)
 
     # minimax algo
     start_time_minimax = time.time()
+    coverage_minimax = None
     if(game_choice == 'dotsandboxes' and game_size == 'large'):
-        best_move_minimax, _ = minimax_sample(game, MAX_DEPTH, game_size, True, node_counter_minimax, 1000)
+        # full-width minimax doesn't finish here: reproducible selective search within the default node budget
+        best_move_minimax, _, coverage_minimax = selective_search(game, game_size, True, node_counter_minimax)
     else:
         best_move_minimax, _ = minimax(game, MAX_DEPTH, game_size, True, node_counter_minimax, None)
     end_time_minimax = time.time()
     time_minimax = end_time_minimax - start_time_minimax
 
-    tt = TranspositionTable() if has_tt else None
-
-    # COMPARISONS 1 AND 4: minimax w/ alpha-beta algo (+ transposition tables)
-    if(agent in ['cmp1', 'cmp4']):
-        if(agent == 'cmp1'):
-            agent = "Alpha-Beta Pruning"
-        else:
-            agent = "Alpha-Beta Pruning + Transposition"
-        start_time_agent = time.time()
-        best_move_agent, _ = alphabeta(game, MAX_DEPTH, game_size, float('-inf'), float('inf'), True, node_counter_agent, tt)
-        end_time_agent = time.time()
-        time_agent = end_time_agent - start_time_agent
-    
-    # COMPARISON 3: minimax + transposition tables
-    elif(agent == 'cmp3'):
-        agent = "Minimax + Transposition"
-        start_time_agent = time.time()
-        best_move_agent, _ = minimax(game, MAX_DEPTH, game_size, True, node_counter_agent, tt)
-        end_time_agent = time.time()
-        time_agent = end_time_agent - start_time_agent
-
-    # COMPARISONS 2 AND 5: scout (+ transposition tables)
-    elif(agent in ['cmp2', 'cmp5']):
-        if(agent == 'cmp2'):
-            agent = "Scout"
-        else:
-            agent = "Scout + Transposition"
-        start_time_agent = time.time()
-        best_move_agent, _ = scout(game, MAX_DEPTH, game_size, float('-inf'), float('inf'), True, node_counter_agent, tt)
-        end_time_agent = time.time()
-        time_agent = end_time_agent - start_time_agent
+    # the agent gets its leaf helpers (oracle, tablebase, evaluator, batching) only now, so the
+    # minimax baseline stays as it was
+    result = run_agent(game, MAX_DEPTH, game_size, agent, options)
 
     # metrics
-    if(game_choice == 'dotsandboxes' and game_size == 'large'):
-        print(f"\nMinimax Sampling Results for {game_choice.replace('_', ' ').title()}:")
+    if coverage_minimax is not None:
+        print(f"\nSelective Search Results for {game_choice.replace('_', ' ').title()}:")
     else:
         print(f"\nMinimax Results for {game_choice.replace('_', ' ').title()}:")
     print(f"Best Move: {best_move_minimax}")
-    print(f"Nodes Explored: {node_counter_minimax['nodes']}")
+    print(f"Nodes Explored: {node_counter_minimax.nodes}")
     print(f"Time Taken: {time_minimax:.6f} seconds")
+    if coverage_minimax is not None:
+        print(coverage_line(coverage_minimax))
+    if detailed:
+        for line in node_counter_minimax.summary():
+            print(line)
 
-    print("\n{} Results for {}:".format(agent, game_choice.replace('_', ' ').title()))
-    print(f"Best Move: {best_move_agent}")
-    print(f"Nodes Explored: {node_counter_agent['nodes']}")
-    print(f"Time Taken: {time_agent:.6f} seconds")
+    print("\n{} Results for {}:".format(result.agent, game_choice.replace('_', ' ').title()))
+    print(f"Best Move: {result.move}")
+    print(f"Nodes Explored: {result.nodes}")
+    print(f"Time Taken: {result.time:.6f} seconds")
+    if result.depth is not None:
+        print(f"Depth Reached: {result.depth}")
+    if result.coverage is not None:
+        print(coverage_line(result.coverage))
+    if result.windows is not None:
+        print(f"Alpha-Beta Calls: {result.windows['passes']} ({result.windows['researches']} re-searches)")
+    tt_stats = result.tt_stats
+    if tt_stats is not None:
+        print(f"TT Hits/Misses: {tt_stats['hits']}/{tt_stats['misses']} (collisions: {tt_stats['collisions']}, overwrites: {tt_stats['overwrites']}, entries: {tt_stats['entries']})")
+    if result.book is not None:
+        print(f"Book: {result.book[0]} entries loaded, {result.book[1]} saved")
+    if result.stats is not None:
+        for line in result.stats.summary():
+            print(line)
+    if result.profiler is not None:
+        for line in result.profiler.summary():
+            print(line)
+    if result.orderer is not None:
+        print("Cutoffs by depth:")
+        for depth, depth_stats in result.orderer.stats().items():
+            print(f"  depth {depth}: {depth_stats['cutoffs']}/{depth_stats['nodes']} nodes cut off, {depth_stats['first_move_rate']:.0%} on the first move")
 
     # analysis of improvement
-    if node_counter_minimax['nodes'] > 0:
-        node_reduction = ((node_counter_minimax['nodes'] - node_counter_agent['nodes']) / node_counter_minimax['nodes']) * 100
+    if node_counter_minimax.nodes > 0:
+        node_reduction = ((node_counter_minimax.nodes - result.nodes) / node_counter_minimax.nodes) * 100
     else:
         node_reduction = 0
     if time_minimax > 0:
-        time_reduction = ((time_minimax - time_agent) / time_minimax) * 100
+        time_reduction = ((time_minimax - result.time) / time_minimax) * 100
     else:
         time_reduction = 0
 
@@ -0,0 +1,258 @@
+import math
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from negamax import game_protocol
+from scores import INF
+from searchstats import SearchStats
+
+# uct exploration constant
+EXPLORATION = math.sqrt(2)
+# iterations when neither an iteration count nor a time budget is given
+DEFAULT_ITERATIONS = 2000
+# the clock is only read every this many iterations
+CLOCK_INTERVAL = 32
+
+ROOT_PARALLEL = 'root'
+LEAF_PARALLEL = 'leaf'
+
+def reward_for_player1(score, color):
+    # a win/loss/draw (or heuristic) score for the side to move as PLAYER1's playout reward
+    if score == 0:
+        return 0.5
+    return 1.0 if (score > 0) == (color == 1) else 0.0
+
+class NodePool:
+    # the tree as parallel arrays: node 0 is the root, the children of a node are one contiguous block
+    def __init__(self):
+        self.parent = array('i')
+        self.first_child = array('i')    # -1 until the node is expanded
+        self.child_count = array('i')
+        self.mover = array('b')          # side that made the move into the node
+        self.visits = array('i')
+        self.reward = array('d')         # total playout reward for the mover
+        self.moves = []                  # move into the node
+        self.add(-1, None, 0)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add(self, parent, move, mover):
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.mover.append(mover)
+        self.visits.append(0)
+        self.reward.append(0.0)
+        self.moves.append(move)
+
+    def expand(self, node, moves, mover):
+        self.first_child[node] = len(self.moves)
+        self.child_count[node] = len(moves)
+        for move in moves:
+            self.add(node, move, mover)
+
+    def select(self, node, exploration):
+        # uct: unvisited children first (in move order), else the best upper confidence bound
+        first = self.first_child[node]
+        log_visits = math.log(self.visits[node])
+        best = first
+        best_bound = -INF
+        for child in range(first, first + self.child_count[node]):
+            visits = self.visits[child]
+            if visits == 0:
+                return child
+            bound = self.reward[child] / visits + exploration * math.sqrt(log_visits / visits)
+            if bound > best_bound:
+                best_bound = bound
+                best = child
+        return best
+
+    def children(self, node):
+        first = self.first_child[node]
+        return range(first, first + max(0, self.child_count[node]))
+
+class MCTS:
+    # uct search over the game protocol (moves/play/undo/outcome), so extra turns and every game work
+    # as in the negamax core; playouts are uniformly random
+    def __init__(self, game, game_size, color, seed=0, exploration=EXPLORATION):
+        self.game = game
+        self.protocol = game_protocol(game, game_size)
+        self.color = color
+        self.rng = random.Random(seed)
+        self.exploration = exploration
+        self.pool = NodePool()
+
+    def playout(self, color, node_counter):
+        # random moves to the end of the game; PLAYER1's reward
+        protocol = self.protocol
+        played = []
+        while True:
+            result = protocol.outcome(color)
+            if result is not None:
+                break
+            moves = protocol.moves()
+            if not moves:
+                result = protocol.evaluate(color)
+                break
+            move = self.rng.choice(moves)
+            node_counter.nodes += 1
+            played.append(move)
+            if not protocol.play(move, color):
+                color = -color
+        reward = reward_for_player1(result, color)
+        for move in reversed(played):
+            protocol.undo(move)
+        return reward
+
+    def descend(self, node_counter):
+        # selection + expansion: the node to simulate from, the moves played to reach it (with the
+        # side that played each) and the side to move there
+        pool = self.pool
+        protocol = self.protocol
+        node = 0
+        color = self.color
+        path = []
+        while pool.first_child[node] != -1 and pool.child_count[node] > 0:
+            node = pool.select(node, self.exploration)
+            path.append((pool.moves[node], color))
+            node_counter.nodes += 1
+            if not protocol.play(pool.moves[node], color):
+                color = -color
+        if pool.first_child[node] == -1 and protocol.outcome(color) is None:
+            moves = protocol.moves()
+            pool.expand(node, moves, color)
+            if moves:
+                node = pool.first_child[node]
+                path.append((pool.moves[node], color))
+                node_counter.nodes += 1
+                if not protocol.play(pool.moves[node], color):
+                    color = -color
+        return node, path, color
+
+    def back_up(self, node, reward, playouts):
+        # reward: PLAYER1's total over the playouts
+        pool = self.pool
+        while node != -1:
+            pool.visits[node] += playouts
+            pool.reward[node] += reward if pool.mover[node] == 1 else playouts - reward
+            node = pool.parent[node]
+
+    def run(self, node_counter, iterations=None, deadline=None, executor=None, playouts=1):
+        # anytime: stops after iterations or at the deadline, whichever comes first. with an executor,
+        # each leaf gets playouts parallel playouts (leaf parallelism) instead of one local playout
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and done % CLOCK_INTERVAL == 0 and time.perf_counter() > deadline:
+                break
+            node, path, color = self.descend(node_counter)
+            if executor is None:
+                reward = self.playout(color, node_counter)
+                count = 1
+            else:
+                seeds = [self.rng.getrandbits(32) for _ in range(playouts)]
+                results = list(executor.map(leaf_playout, [path] * playouts, [color] * playouts, seeds))
+                reward = sum(r for r, _ in results)
+                node_counter.nodes += sum(n for _, n in results)
+                count = playouts
+            for move, _ in reversed(path):
+                self.protocol.undo(move)
+            self.back_up(node, reward, count)
+            done += 1
+        return done
+
+    def root_stats(self):
+        # {move: (visits, total reward for the root side)}
+        pool = self.pool
+        return {pool.moves[child]: (pool.visits[child], pool.reward[child]) for child in pool.children(0)}
+
+def best_from_stats(stats):
+    # most visited move (first in move order on ties) and its mean reward
+    best_move = None
+    best_visits = -1
+    for move, (visits, reward) in stats.items():
+        if visits > best_visits:
+            best_move, best_visits = move, visits
+    if best_move is None or best_visits == 0:
+        return best_move, None
+    return best_move, stats[best_move][1] / best_visits
+
+# per-worker state for leaf-parallel playouts: the root position, set up once per process
+worker_search = None
+
+def init_leaf_worker(game, game_size, color, seed):
+    global worker_search
+    worker_search = MCTS(game, game_size, color, seed)
+
+def leaf_playout(path, color, seed):
+    # replays the path from the root, plays one random game and takes it all back;
+    # returns (PLAYER1's reward, positions visited)
+    search = worker_search
+    search.rng.seed(seed)
+    for move, mover in path:
+        search.protocol.play(move, mover)
+    counter = SearchStats()
+    reward = search.playout(color, counter)
+    for move, _ in reversed(path):
+        search.protocol.undo(move)
+    return reward, counter.nodes
+
+def root_worker(game, game_size, color, seed, iterations, deadline):
+    # one independent tree (root parallelism); returns its root statistics and node count
+    counter = SearchStats()
+    search = MCTS(game, game_size, color, seed)
+    search.run(counter, iterations, deadline)
+    return search.root_stats(), counter.nodes
+
+def mcts_search(game, game_size, maximizingPlayer, node_counter, iterations=None, time_limit=None,
+                workers=None, parallel=ROOT_PARALLEL, seed=0):
+    # monte carlo tree search within an iteration and/or time budget; returns the most visited root
+    # move and its mean playout reward for the maximizer (a win probability, not a heuristic score)
+    #   workers=None   one tree in this process
+    #   root parallel  workers independent trees (different seeds), root statistics summed
+    #   leaf parallel  one tree here, every leaf simulated by workers playouts at once
+    color = 1 if maximizingPlayer else -1
+    if iterations is None and time_limit is None:
+        iterations = DEFAULT_ITERATIONS
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    node_counter.nodes += 1
+
+    if workers is None:
+        search = MCTS(game, game_size, color, seed)
+        search.run(node_counter, iterations, deadline)
+        stats = search.root_stats()
+    elif parallel == ROOT_PARALLEL:
+        workers = workers or os.cpu_count()
+        # the iteration budget is split between the trees, a time budget applies to each
+        share = -(-iterations // workers) if iterations is not None else None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(root_worker, game, game_size, color, seed + i, share, deadline)
+                       for i in range(workers)]
+            stats = {}
+            for future in futures:
+                worker_stats, nodes = future.result()
+                node_counter.nodes += nodes
+                for move, (visits, reward) in worker_stats.items():
+                    total_visits, total_reward = stats.get(move, (0, 0.0))
+                    stats[move] = (total_visits + visits, total_reward + reward)
+    elif parallel == LEAF_PARALLEL:
+        workers = workers or os.cpu_count()
+        search = MCTS(game, game_size, color, seed)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_leaf_worker,
+                                 initargs=(game, game_size, color, seed)) as executor:
+            # each iteration runs workers playouts, so the iteration budget covers that many playouts
+            search.run(node_counter, -(-iterations // workers) if iterations is not None else None,
+                       deadline, executor, workers)
+        stats = search.root_stats()
+    else:
+        raise ValueError(f"unknown mcts parallelism: {parallel}")
+
+    best_move, reward = best_from_stats(stats)
+    if reward is None:
+        # no playout finished (terminal root or no time): any legal move
+        moves = game_protocol(game, game_size).moves()
+        return (moves[0] if moves else None), None
+    # stats are for the root side
+    return best_move, reward if maximizingPlayer else 1 - reward
@@ -0,0 +1,126 @@
+from connectfour import ConnectFour
+from dotsandboxes import DotsAndBoxes
+from nim import Nim
+
+KILLER_SLOTS = 2
+
+# sort-key bonuses: tt move > killers > game prior > history
+TT_MOVE_BONUS = 1 << 40
+KILLER_BONUS = 1 << 30
+PRIOR_WEIGHT = 1 << 20
+
+class MoveOrderer:
+    # shared across one search (or all iterations of iterative deepening)
+    def __init__(self, use_tt_move=True, use_killers=True, use_history=True, use_priors=True):
+        self.use_tt_move = use_tt_move
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.use_priors = use_priors
+        self.killers = {}   # depth -> most recent cutoff moves at that depth
+        self.history = {}   # move -> accumulated depth^2 of the cutoffs it caused
+        self.nodes = {}     # depth -> nodes whose moves were ordered
+        self.cutoffs = {}   # depth -> {move index: cutoffs}
+
+    def order(self, game, valid_moves, depth, tt_move=None):
+        self.nodes[depth] = self.nodes.get(depth, 0) + 1
+        if len(valid_moves) < 2:
+            return valid_moves
+
+        scores = dict.fromkeys(valid_moves, 0)
+        if self.use_priors:
+            for move, prior in game_priors(game, valid_moves).items():
+                scores[move] += prior * PRIOR_WEIGHT
+        if self.use_history:
+            for move in valid_moves:
+                scores[move] += self.history.get(move, 0)
+        if self.use_killers:
+            for slot, killer in enumerate(self.killers.get(depth, ())):
+                if killer in scores:
+                    scores[killer] += KILLER_BONUS >> slot
+        if self.use_tt_move and tt_move in scores:
+            scores[tt_move] += TT_MOVE_BONUS
+
+        # stable: ties keep get_valid_moves order
+        return sorted(valid_moves, key=scores.__getitem__, reverse=True)
+
+    def record_cutoff(self, move, depth, move_index):
+        by_index = self.cutoffs.setdefault(depth, {})
+        by_index[move_index] = by_index.get(move_index, 0) + 1
+
+        if self.use_killers:
+            killers = self.killers.setdefault(depth, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[KILLER_SLOTS:]
+        if self.use_history:
+            self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def stats(self):
+        # per depth: ordered nodes, cutoffs, and the share of cutoffs caused by the first move
+        stats = {}
+        for depth in sorted(set(self.nodes) | set(self.cutoffs), reverse=True):
+            by_index = self.cutoffs.get(depth, {})
+            cutoffs = sum(by_index.values())
+            stats[depth] = {
+                'nodes': self.nodes.get(depth, 0),
+                'cutoffs': cutoffs,
+                'first_move_rate': by_index.get(0, 0) / cutoffs if cutoffs else 0.0,
+                'by_index': dict(sorted(by_index.items())),
+            }
+        return stats
+
+def game_priors(game, valid_moves):
+    # cheap static preference for each move (higher ==> searched earlier)
+    if isinstance(game, ConnectFour):
+        return connect_four_priors(game, valid_moves)
+    elif isinstance(game, Nim):
+        return nim_priors(game, valid_moves)
+    elif isinstance(game, DotsAndBoxes):
+        return dots_and_boxes_priors(game, valid_moves)
+    return {}
+
+def connect_four_priors(game, valid_moves):
+    # center columns first
+    center = (game.cols - 1) / 2
+    return {col: -abs(col - center) for col in valid_moves}
+
+def nim_priors(game, valid_moves):
+    # moves back to nim-sum 0 first
+    nimber = 0
+    for heap in game.heaps:
+        nimber ^= heap
+    priors = {}
+    for heap_index, remove_count in valid_moves:
+        heap = game.heaps[heap_index]
+        priors[(heap_index, remove_count)] = 1 if heap - remove_count == heap ^ nimber else 0
+    return priors
+
+def dots_and_boxes_priors(game, valid_moves):
+    # completing a box first, handing the opponent a third side last
+    if game.macro_moves:
+        # macro moves: more captures first, then by the final line (judged on the current board)
+        return {move: 2 * (len(move) - 1) + line_prior(game, move[-1]) for move in valid_moves}
+    return {move: line_prior(game, move) for move in valid_moves}
+
+def line_prior(game, move):
+    prior = 0
+    for sides in adjacent_box_sides(game, move):
+        if sides == 3:
+            prior += 2
+        elif sides == 2:
+            prior -= 1
+    return prior
+
+def adjacent_box_sides(game, move):
+    # filled sides of the (one or two) boxes next to a line
+    line_type, i, j = move
+    if line_type == 'h':
+        boxes = [(i - 1, j), (i, j)]
+    else:
+        boxes = [(i, j - 1), (i, j)]
+    sides = []
+    for r, c in boxes:
+        if 0 <= r < game.size and 0 <= c < game.size:
+            sides.append((game.h_lines[r][c] != 0) + (game.h_lines[r + 1][c] != 0) +
+                         (game.v_lines[r][c] != 0) + (game.v_lines[r][c + 1] != 0))
+    return sides
@@ -0,0 +1,106 @@
+import copy
+import time
+from alphabeta import alphabeta
+from iterativedeepening import BudgetCounter, SearchTimeout, MAX_ITERATIONS
+from negamax import game_protocol
+from transpositiontable import TranspositionTable
+from scores import INF, is_mate
+
+# aspiration: half-width of the first window around the previous iteration's value; doubled on the
+# failing side after every fail-low/fail-high
+ASPIRATION_WINDOW = 10
+
+MTDF = 'mtdf'
+ASPIRATION = 'aspiration'
+
+# drivers take (game, depth, game_size, guess, maximizingPlayer, node_counter, tt, orderer) and return
+# (best move, value, alphabeta calls); values and guesses are from the maximizer's point of view.
+# scores are integers (see scores), so a zero window is (beta - 1, beta)
+
+def mtdf(game, depth, game_size, guess, maximizingPlayer, node_counter, tt, orderer=None, window=None):
+    # mtd(f): zero-window alpha-beta calls that move a bound towards the value until the bounds meet;
+    # the table keeps the bounds of earlier calls, so each call mostly retraces the previous tree
+    lower, upper = -INF, INF
+    value = 0 if guess is None else guess
+    best_move = None
+    fallback = None
+    passes = 0
+    while lower < upper:
+        beta = value + 1 if value == lower else value
+        move, value = alphabeta(game, depth, game_size, beta - 1, beta, maximizingPlayer, node_counter, tt, orderer)
+        passes += 1
+        if move is not None:
+            fallback = move
+        if value < beta:
+            upper = value
+        else:
+            lower = value
+            # a fail-high proves this move reaches the new lower bound
+            if move is not None:
+                best_move = move
+    return best_move if best_move is not None else fallback, value, passes
+
+def aspiration(game, depth, game_size, guess, maximizingPlayer, node_counter, tt, orderer=None, window=ASPIRATION_WINDOW):
+    # alpha-beta in a window around the guess, widened and searched again while the value falls outside it
+    if guess is None or is_mate(guess):
+        move, value = alphabeta(game, depth, game_size, -INF, INF, maximizingPlayer, node_counter, tt, orderer)
+        return move, value, 1
+    delta = window
+    alpha, beta = guess - delta, guess + delta
+    passes = 0
+    while True:
+        move, value = alphabeta(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt, orderer)
+        passes += 1
+        if value <= alpha and alpha != -INF:
+            delta *= 2
+            alpha = max(-INF, value - delta)
+        elif value >= beta and beta != INF:
+            delta *= 2
+            beta = min(INF, value + delta)
+        else:
+            return move, value, passes
+
+DRIVERS = {MTDF: mtdf, ASPIRATION: aspiration}
+
+def windowed_search(game, game_size, maximizingPlayer, node_counter, tt, driver=MTDF, max_depth=MAX_ITERATIONS,
+                    time_limit=None, node_limit=None, orderer=None, window=ASPIRATION_WINDOW):
+    # iterative deepening where each depth is searched by the driver, starting from the previous depth's
+    # value. without a budget it runs every depth up to max_depth. returns the best move and value of the
+    # deepest completed depth and a report of the alphabeta calls it took
+    search = DRIVERS[driver]
+    if driver == MTDF and tt is None:
+        # mtd(f) relies on the table to avoid re-searching from scratch
+        tt = TranspositionTable()
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    counter = BudgetCounter(node_limit, deadline, node_counter.enabled)
+
+    valid_moves = game_protocol(game, game_size).moves()
+    best_move = valid_moves[0] if valid_moves else None
+    best_value = None
+    completed_depth = 0
+    passes = 0
+
+    for depth in range(1, max_depth + 1):
+        if tt is not None:
+            tt.new_search()
+        # an aborted search leaves moves applied, so each depth runs on its own copy
+        search_game = copy.deepcopy(game)
+        try:
+            move, value, calls = search(search_game, depth, game_size, best_value, maximizingPlayer, counter, tt, orderer, window)
+        except SearchTimeout:
+            break
+        passes += calls
+        if move is not None:
+            best_move = move
+        best_value = value
+        completed_depth = depth
+
+        # proven win/loss: deeper iterations can't change the answer (under a budget; a fixed depth is
+        # always searched to the end, like a plain alphabeta call)
+        if is_mate(value) and (time_limit is not None or node_limit is not None):
+            break
+
+    node_counter.merge(counter)
+    # re-searches: calls beyond the one per depth a correct first window would have needed
+    report = {'depth': completed_depth, 'passes': passes, 'researches': passes - completed_depth}
+    return best_move, best_value, report
@@ -0,0 +1,384 @@
+from connectfour import ConnectFour, BitboardConnectFour, PLAYER1, PLAYER2
+from dotsandboxes import DotsAndBoxes
+from nim import Nim
+from heuristic import evaluate_connect_four, evaluate_dots_and_boxes, evaluate_nim
+from nimsolver import solver_for
+from vectorheuristic import evaluate_batch, evaluate_nim_batch, evaluate_dots_and_boxes_batch
+from transpositiontable import EXACT, LOWERBOUND, UPPERBOUND
+from scores import WIN, INF, score_at_ply
+
+# game protocol: everything the search core needs, resolved once per search instead of per node.
+# color is +1 when PLAYER1 (the maximizer) is to move and -1 for PLAYER2; outcome/evaluate are
+# scored for the side to move
+#   moves()              valid moves
+#   play(move, color)    apply a move for color; True if the same side moves again
+#   undo(move)           take it back
+#   outcome(color)       None if the game isn't over, else WIN/-WIN/0 (the core adds the distance)
+#   evaluate(color)      heuristic score (PROVEN_WIN/-PROVEN_WIN for an exact result, see scores)
+#   key(color)           zobrist hash including side to move
+#   encode()             compact copy of the position for leaf batching
+#   evaluate_batch(rows, color)   evaluate() of many encoded positions in one vectorized call
+
+class ConnectFourProtocol:
+    def __init__(self, game, game_size):
+        self.moves = game.get_valid_moves
+        self.undo = game.undo_move
+        self.game = game
+        if game.evaluator is not None:
+            # incremental window scores, kept up to date by make/undo
+            self.evaluate = game.evaluator.score
+
+    def play(self, move, color):
+        # PLAYER1/PLAYER2 are +1/-1, so color is already the piece to drop (make_move's
+        # success flag must not read as an extra turn)
+        self.game.make_move(move, color)
+
+    def outcome(self, color):
+        game = self.game
+        if game.check_win(color):
+            return WIN
+        if game.check_win(-color):
+            return -WIN
+        if game.is_full():
+            return 0
+        return None
+
+    def evaluate(self, color):
+        return evaluate_connect_four(self.game, color)
+
+    def key(self, color):
+        return self.game.get_hash(color == 1)
+
+    def encode(self):
+        return [cell for row in self.game.board for cell in row]
+
+    def evaluate_batch(self, rows, color):
+        return evaluate_batch(rows, color, self.game.rows, self.game.cols).tolist()
+
+class BitboardConnectFourProtocol(ConnectFourProtocol):
+    def __init__(self, game, game_size):
+        super().__init__(game, game_size)
+        # mask bit of each cell in board order (top row first)
+        self.cell_bits = [col * game.height + game.rows - 1 - row for row in range(game.rows) for col in range(game.cols)]
+
+    def encode(self):
+        player1_mask = self.game.player1_mask
+        player2_mask = self.game.player2_mask
+        return [PLAYER1 if player1_mask >> bit & 1 else PLAYER2 if player2_mask >> bit & 1 else 0 for bit in self.cell_bits]
+
+    def outcome(self, color):
+        game = self.game
+        if game.winner is not None:
+            return WIN if game.winner == color else -WIN
+        if game.filled == game.rows * game.cols:
+            return 0
+        return None
+
+class NimProtocol:
+    def __init__(self, game, game_size):
+        self.game = game
+        self.game_size = game_size
+        self.solver = solver_for(game, game_size) if game.oracle else None
+
+    def moves(self):
+        return self.game.get_valid_moves(self.game_size)
+
+    def play(self, move, color):
+        self.game.make_move(move[0], move[1])
+
+    def undo(self, move):
+        self.game.undo_move(move[0], move[1])
+
+    def outcome(self, color):
+        # last move wins: whoever is to move on empty heaps has lost
+        return -WIN if not any(self.game.heaps) else None
+
+    def evaluate(self, color):
+        if self.solver is not None:
+            # perfect leaf: grundy value under this size's removal rule
+            return self.solver.value(self.game.heaps)
+        # evaluate_nim scores for the maximizer
+        return color * evaluate_nim(self.game, color == 1)
+
+    def key(self, color):
+        return self.game.get_hash(color == 1)
+
+    def encode(self):
+        return list(self.game.heaps)
+
+    def evaluate_batch(self, rows, color):
+        grundy = self.solver.grundy if self.solver is not None else None
+        return evaluate_nim_batch(rows, color, grundy).tolist()
+
+class DotsAndBoxesProtocol:
+    def __init__(self, game, game_size):
+        self.game = game
+        self.moves = game.get_valid_moves
+        self.undo = game.undo_move
+
+    def play(self, move, color):
+        self.game.set_current_player(color)
+        completed = self.game.make_move(move)
+        # extra-turn rules: completing a box means moving again
+        return self.game.extra_turn and completed > 0
+
+    def outcome(self, color):
+        if not self.game.is_terminal_node():
+            return None
+        score = evaluate_dots_and_boxes(self.game, color == 1)
+        return WIN if score > 0 else -WIN if score < 0 else 0
+
+    def evaluate(self, color):
+        return evaluate_dots_and_boxes(self.game, color == 1)
+
+    def key(self, color):
+        return self.game.get_hash(color == 1)
+
+    def encode(self):
+        return self.game.box_count[PLAYER1] - self.game.box_count[PLAYER2]
+
+    def evaluate_batch(self, rows, color):
+        return evaluate_dots_and_boxes_batch(rows, color).tolist()
+
+class DotsAndBoxesMacroProtocol(DotsAndBoxesProtocol):
+    # one move = one whole turn (captures + a final line), so the turn always passes
+    def __init__(self, game, game_size):
+        self.game = game
+        self.moves = game.get_macro_moves
+        self.undo = game.undo_macro_move
+
+    def play(self, move, color):
+        self.game.set_current_player(color)
+        self.game.make_macro_move(move)
+
+def game_protocol(game, game_size):
+    if isinstance(game, BitboardConnectFour):
+        return BitboardConnectFourProtocol(game, game_size)
+    elif isinstance(game, ConnectFour):
+        return ConnectFourProtocol(game, game_size)
+    elif isinstance(game, Nim):
+        return NimProtocol(game, game_size)
+    elif isinstance(game, DotsAndBoxes):
+        if game.macro_moves:
+            return DotsAndBoxesMacroProtocol(game, game_size)
+        return DotsAndBoxesProtocol(game, game_size)
+    raise TypeError(f"no search protocol for {type(game).__name__}")
+
+def negamax(game, depth, game_size, color, node_counter, tt=None, alpha=-INF, beta=INF,
+            prune=True, null_window=False, orderer=None, batch_depth=None):
+    # single search core behind minimax, alphabeta and pvs:
+    #   prune=False        plain minimax (tt uses the mm table)
+    #   prune=True         alpha-beta (tt uses the ab table)
+    #   null_window=True   principal variation search on top of alpha-beta
+    #   batch_depth        leaf batching: nodes this close to the leaves (only the last ply when pruning)
+    #                      collect their frontier and evaluate it in one vectorized call per side to move
+    # node_counter is a SearchStats (detailed counts only if it is enabled)
+    # returns (best move, value for the side to move); forced results count plies from this root (see scores)
+    protocol = game_protocol(game, game_size)
+    moves = protocol.moves
+    play = protocol.play
+    undo = protocol.undo
+    outcome = protocol.outcome
+    evaluate = protocol.evaluate
+    key = protocol.key
+    use_tt = tt is not None
+    null_window = null_window and prune
+    # symmetry: the table is keyed by the canonical board, its moves are stored in the canonical frame
+    use_symmetry = use_tt and game.symmetry
+    # endgame tablebase (if the caller attached one to the game): exact, undistanced results at the leaves
+    tablebase = getattr(game, 'tablebase', None)
+    if tablebase is not None and not tablebase.covers(game, game_size):
+        tablebase = None
+    if use_symmetry:
+        canonical = game.get_canonical_hash
+        to_canonical = game.to_canonical_move
+        from_canonical = game.from_canonical_move
+    # leaf batching (if the caller attached a depth to the game)
+    if batch_depth is None:
+        batch_depth = getattr(game, 'batch_leaves', None)
+    if batch_depth is not None and prune:
+        # pruning needs each leaf's value before the next, so only a last-ply node's children batch
+        batch_depth = 1
+    encode = protocol.encode
+    evaluate_batch = protocol.evaluate_batch
+    detailed = node_counter.enabled
+    if detailed:
+        nodes_by_depth = node_counter.nodes_by_depth
+        cutoffs_by_index = node_counter.cutoffs_by_index
+        if use_tt:
+            node_counter.watch(tt)
+
+    root_depth = depth
+
+    def search(depth, alpha, beta, color):
+        node_counter.nodes += 1
+        if detailed:
+            nodes_by_depth[depth] += 1
+        ply = root_depth - depth
+
+        # mate distance pruning: nothing below can win sooner than here or lose later than here, so
+        # a window outside [ply - WIN, WIN - ply] is already decided (a win found elsewhere then cuts
+        # off every longer line, like equal infinite scores used to)
+        if prune:
+            if alpha < ply - WIN:
+                alpha = ply - WIN
+            if beta > WIN - ply:
+                beta = WIN - ply
+            if alpha >= beta:
+                return None, alpha
+        original_alpha = alpha
+
+        # transposition table (if specified) lookup
+        tt_move = None
+        if use_tt:
+            if use_symmetry:
+                state_key, frame = canonical(color == 1)
+            else:
+                state_key = key(color)
+            if prune:
+                found, tt_move, tt_value = tt.ab_lookup(state_key, depth, alpha, beta, ply)
+            else:
+                found, tt_move, tt_value = tt.mm_lookup(state_key, depth, ply)
+            if use_symmetry and tt_move is not None:
+                tt_move = from_canonical(tt_move, frame)
+            if found:
+                return tt_move, tt_value
+
+        # terminal node / depth limit
+        result = outcome(color)
+        if result is not None:
+            if detailed:
+                node_counter.leaves += 1
+            return None, score_at_ply(result, ply)
+        if depth == 0:
+            if detailed:
+                node_counter.leaves += 1
+            if tablebase is not None:
+                exact = tablebase.probe(game, color)
+                if exact is not None:
+                    return None, exact
+            if detailed:
+                node_counter.evaluations += 1
+            return None, score_at_ply(evaluate(color), ply)
+
+        valid_moves = moves()
+        if not valid_moves:
+            if detailed:
+                node_counter.leaves += 1
+                node_counter.evaluations += 1
+            return None, score_at_ply(evaluate(color), ply)
+        if orderer is not None:
+            valid_moves = orderer.order(game, valid_moves, depth, tt_move)
+        elif tt_move is not None and tt_move in valid_moves:
+            valid_moves.remove(tt_move)
+            valid_moves.insert(0, tt_move)
+
+        if batch_depth is not None and depth <= batch_depth:
+            best_move, value = batched(valid_moves, depth, color)
+        else:
+            value = -INF
+            best_move = None
+            for move_index, move in enumerate(valid_moves):
+                if play(move, color):
+                    # extra turn: the same side moves again, so no negation
+                    score = search(depth - 1, alpha, beta, color)[1]
+                elif null_window and move_index > 0 and alpha != -INF:
+                    # null-window probe, re-searched only on a strict fail-high inside the window
+                    score = -search(depth - 1, -alpha - 1, -alpha, -color)[1]
+                    if alpha < score < beta:
+                        if detailed:
+                            node_counter.researches += 1
+                        score = -search(depth - 1, -beta, -alpha, -color)[1]
+                else:
+                    score = -search(depth - 1, -beta, -alpha, -color)[1]
+                undo(move)
+
+                if score > value:
+                    value = score
+                    best_move = move
+                if prune:
+                    if value > alpha:
+                        alpha = value
+                    if alpha >= beta:
+                        if detailed:
+                            cutoffs_by_index[move_index] += 1
+                        if orderer is not None:
+                            orderer.record_cutoff(move, depth, move_index)
+                        break
+
+        # store in transposition table (if specified)
+        if use_tt:
+            stored_move = best_move
+            if use_symmetry and best_move is not None:
+                stored_move = to_canonical(best_move, frame)
+            if not prune:
+                tt.mm_store(state_key, depth, value, stored_move, ply)
+            else:
+                if value <= original_alpha:
+                    flag = UPPERBOUND
+                elif value >= beta:
+                    flag = LOWERBOUND
+                else:
+                    flag = EXACT
+                tt.ab_store(state_key, depth, value, stored_move, flag, original_alpha, beta, ply)
+
+        return best_move, value
+
+    # leaf batching: the subtree below a batching node is expanded without evaluating anything, as
+    # ('value', score) for decided positions, ('leaf', color, row index, ply) for positions to evaluate and
+    # ('node', [(sign, subtree), ...]); then every leaf is evaluated in bulk and the values backed up
+    def expand_child(move, depth, color, rows):
+        node_counter.nodes += 1
+        if detailed:
+            nodes_by_depth[depth - 1] += 1
+        # extra turn: the same side moves again, so no negation
+        child_color = color if play(move, color) else -color
+        subtree = expand(depth - 1, child_color, rows)
+        undo(move)
+        return (1 if child_color == color else -1), subtree
+
+    def expand(depth, color, rows):
+        ply = root_depth - depth
+        result = outcome(color)
+        if result is not None:
+            if detailed:
+                node_counter.leaves += 1
+            return 'value', score_at_ply(result, ply)
+        valid_moves = moves() if depth > 0 else None
+        if not valid_moves:
+            if detailed:
+                node_counter.leaves += 1
+            if depth == 0 and tablebase is not None:
+                exact = tablebase.probe(game, color)
+                if exact is not None:
+                    return 'value', exact
+            rows[color].append(encode())
+            return 'leaf', color, len(rows[color]) - 1, ply
+        return 'node', [expand_child(move, depth, color, rows) for move in valid_moves]
+
+    def back_up(subtree, values):
+        if subtree[0] == 'value':
+            return subtree[1]
+        if subtree[0] == 'leaf':
+            return score_at_ply(values[subtree[1]][subtree[2]], subtree[3])
+        return max(sign * back_up(child, values) for sign, child in subtree[1])
+
+    def batched(valid_moves, depth, color):
+        rows = {1: [], -1: []}
+        children = [expand_child(move, depth, color, rows) for move in valid_moves]
+        values = {}
+        for side, side_rows in rows.items():
+            if side_rows:
+                if detailed:
+                    node_counter.evaluations += len(side_rows)
+                values[side] = evaluate_batch(side_rows, side)
+        value = -INF
+        best_move = None
+        for move, (sign, child) in zip(valid_moves, children):
+            score = sign * back_up(child, values)
+            if score > value:
+                value = score
+                best_move = move
+        return best_move, value
+
+    return search(depth, alpha, beta, color)
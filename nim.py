@@ -1,17 +1,56 @@
 import random
+from zobrist import zobrist_keys, side_to_move, MASK64
 
 class Nim:
-    def __init__(self, initial_state, game_size, heaps=[3, 5, 7]):
+    # symmetry: also keep an order-independent hash, so permuted heaps share one canonical key
+    # oracle: searches score leaves with the exact grundy value (nimsolver) instead of the heuristic
+    def __init__(self, initial_state, game_size, heaps=[3, 5, 7], symmetry=False, oracle=False):
         self.initial = initial_state
+        self.symmetry = symmetry
+        self.oracle = oracle
         self.heaps = self.init_heaps(heaps, game_size)
-        
+        self.heap_keys = self.init_heap_keys()
+        self.count_keys = zobrist_keys('nim-counts', max(self.heaps, default=0) + 1)
+        self.hash = self.compute_hash()
+        self.multiset_hash = self.compute_multiset_hash()
+
     def get_state_key(self, maximizingPlayer):
         return (maximizingPlayer, tuple(self.heaps))
 
+    def get_hash(self, maximizingPlayer):
+        return side_to_move(self.hash, maximizingPlayer)
+
+    def get_canonical_hash(self, maximizingPlayer):
+        # (key, frame): frame lists the heap indices smallest heap first, canonical moves name heaps by rank
+        frame = tuple(sorted(range(len(self.heaps)), key=self.heaps.__getitem__))
+        return side_to_move(self.multiset_hash, maximizingPlayer), frame
+
+    def to_canonical_move(self, move, frame):
+        return (frame.index(move[0]), move[1])
+
+    def from_canonical_move(self, move, frame):
+        return (frame[move[0]], move[1])
+
+    def compute_multiset_hash(self):
+        # sum of one key per heap size: the same for any order of the heaps
+        return sum(self.count_keys[heap] for heap in self.heaps) & MASK64
+
+    def init_heap_keys(self):
+        # one key per (heap, count); heaps only shrink below their starting size
+        counts = max(self.heaps, default=0) + 1
+        keys = zobrist_keys('nim', len(self.heaps) * counts)
+        return [keys[i * counts:(i + 1) * counts] for i in range(len(self.heaps))]
+
+    def compute_hash(self):
+        key = 0
+        for i, heap in enumerate(self.heaps):
+            key ^= self.heap_keys[i][heap]
+        return key
+
     def init_heaps(self, heaps, game_size):
         if(game_size == 'large'):
             if self.initial is True:
-                return heaps
+                return list(heaps)
             else:
                 return [random.randint(1, 7) for _ in range(len(heaps))]
         elif(game_size == 'medium'):
@@ -35,7 +74,7 @@ class Nim:
             valid_moves = []
             for i, heap in enumerate(self.heaps):
                 if heap > 0:
-                    for remove in range(1, 4):
+                    for remove in range(1, min(heap, 3) + 1):
                         valid_moves.append((i, remove))
             return valid_moves
         valid_moves = []
@@ -46,10 +85,20 @@ class Nim:
         return valid_moves
 
     def make_move(self, heap_index, remove_count):
-        self.heaps[heap_index] -= remove_count
+        keys = self.heap_keys[heap_index]
+        heap = self.heaps[heap_index]
+        self.hash ^= keys[heap] ^ keys[heap - remove_count]
+        if self.symmetry:
+            self.multiset_hash = (self.multiset_hash - self.count_keys[heap] + self.count_keys[heap - remove_count]) & MASK64
+        self.heaps[heap_index] = heap - remove_count
 
     def undo_move(self, heap_index, remove_count):
-        self.heaps[heap_index] += remove_count
+        keys = self.heap_keys[heap_index]
+        heap = self.heaps[heap_index]
+        self.hash ^= keys[heap] ^ keys[heap + remove_count]
+        if self.symmetry:
+            self.multiset_hash = (self.multiset_hash - self.count_keys[heap] + self.count_keys[heap + remove_count]) & MASK64
+        self.heaps[heap_index] = heap + remove_count
 
     def is_terminal_node(self):
         return all(heap == 0 for heap in self.heaps)
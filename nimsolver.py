@@ -0,0 +1,83 @@
+from nim import Nim
+from scores import WIN, PROVEN_WIN
+
+# removal rule per game size (None ==> any number from one heap); the small variant is the
+# subtraction game {1, 2, 3}
+SUBTRACTION_SETS = {'small': (1, 2, 3)}
+
+def grundy_table(max_heap, subtraction=None):
+    # grundy[n] = mex of the grundy values one move away from a heap of n
+    if subtraction is None:
+        return list(range(max_heap + 1))
+    grundy = []
+    for n in range(max_heap + 1):
+        reachable = {grundy[n - k] for k in subtraction if k <= n}
+        value = 0
+        while value in reachable:
+            value += 1
+        grundy.append(value)
+    return grundy
+
+class NimSolver:
+    # perfect play for sums of heaps under one removal rule (normal play: taking the last object wins)
+    def __init__(self, max_heap, subtraction=None):
+        self.max_heap = max_heap
+        self.subtraction = subtraction
+        self.grundy = grundy_table(max_heap, subtraction)
+        # to_grundy[n][g] = smallest removal taking a heap of n to grundy value g; by the mex rule every
+        # g < grundy[n] is reachable, so the winning move is a single lookup per heap (plain nim needs
+        # no table: the removal is n - g)
+        self.to_grundy = None
+        if subtraction is not None:
+            self.to_grundy = []
+            for n in range(max_heap + 1):
+                lookup = {}
+                for k in subtraction:
+                    if k <= n:
+                        lookup.setdefault(self.grundy[n - k], k)
+                self.to_grundy.append(lookup)
+
+    def nim_sum(self, heaps):
+        total = 0
+        for heap in heaps:
+            total ^= self.grundy[heap]
+        return total
+
+    def value(self, heaps):
+        # exact result for the side to move; the grundy values don't say how soon, so a win isn't a
+        # counted mate (see scores)
+        return PROVEN_WIN if self.nim_sum(heaps) else -PROVEN_WIN
+
+    def best_move(self, heaps):
+        # (heap index, remove count) and the exact value for the side to move; in a lost position
+        # the smallest legal move (or None and a real loss if the heaps are empty)
+        total = self.nim_sum(heaps)
+        if total:
+            for i, heap in enumerate(heaps):
+                target = self.grundy[heap] ^ total
+                if target < self.grundy[heap]:
+                    remove = heap - target if self.to_grundy is None else self.to_grundy[heap][target]
+                    return (i, remove), PROVEN_WIN
+        for i, heap in enumerate(heaps):
+            if heap > 0:
+                return (i, 1), -PROVEN_WIN
+        return None, -WIN
+
+solvers = {}
+
+def solver_for(game, game_size):
+    # solvers are cached per removal rule and grown to the largest heap seen
+    subtraction = SUBTRACTION_SETS.get(game_size)
+    max_heap = max(game.heaps, default=0)
+    solver = solvers.get(subtraction)
+    if solver is None or solver.max_heap < max_heap:
+        solver = solvers[subtraction] = NimSolver(max_heap, subtraction)
+    return solver
+
+def nim_solver_search(game, game_size, maximizingPlayer, node_counter):
+    # root oracle: answers without searching; value from the maximizer's point of view like the searches
+    if not isinstance(game, Nim):
+        raise TypeError(f"nim solver can't play {type(game).__name__}")
+    node_counter.nodes += 1
+    best_move, value = solver_for(game, game_size).best_move(game.heaps)
+    return best_move, value if maximizingPlayer else -value
@@ -0,0 +1,81 @@
+import ast
+import sqlite3
+from connectfour import ConnectFour
+from dotsandboxes import DotsAndBoxes
+from nim import Nim
+from transpositiontable import EXACT
+
+# bump when keys, values or moves change meaning (a book of another version is discarded)
+BOOK_VERSION = 2
+# only entries searched at least this deep are worth keeping
+MIN_DEPTH = 2
+
+# how a search keys and scores its entries: the negamax core (minimax, alphabeta, pvs) for the side to
+# move, under canonical keys with symmetry; the original scout for the maximizer, under plain keys
+NEGAMAX = 'negamax'
+SCOUT = 'scout'
+
+def book_variant(game, game_size, search=NEGAMAX):
+    # everything the zobrist keys and stored values depend on
+    variant = [type(game).__name__, game_size, f"symmetry={game.symmetry}", f"search={search}"]
+    if isinstance(game, Nim):
+        # nim keys are laid out by the largest starting heap
+        variant += [f"heaps={len(game.heaps)}", f"counts={len(game.heap_keys[0]) if game.heaps else 0}", f"oracle={game.oracle}"]
+    elif isinstance(game, DotsAndBoxes):
+        variant += [f"extra_turn={game.extra_turn}", f"macro={game.macro_moves}"]
+    elif isinstance(game, ConnectFour):
+        variant += [f"board={game.rows}x{game.cols}"]
+    if getattr(game, 'tablebase', None) is not None:
+        # exact leaves score differently from the heuristic's
+        variant.append("tablebase")
+    return ';'.join(variant)
+
+def to_signed(key):
+    # sqlite integers are signed 64-bit
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+def to_unsigned(key):
+    return key + (1 << 64) if key < 0 else key
+
+class OpeningBook:
+    # EXACT transposition table entries kept across runs in sqlite, one book per game variant
+    def __init__(self, path, variant):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        meta = dict(self.connection.execute("SELECT name, value FROM meta"))
+        stale = meta.get('version') != str(BOOK_VERSION) or meta.get('variant') != variant
+        if stale:
+            # written for another variant (or format): start over (version 1 kept float values)
+            self.connection.execute("DROP TABLE IF EXISTS entries")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS entries (tbl TEXT, key INTEGER, depth INTEGER, "
+                                "value INTEGER, best_move TEXT, PRIMARY KEY (tbl, key))")
+        if stale:
+            self.connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                        [('version', str(BOOK_VERSION)), ('variant', variant)])
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def warm(self, tt):
+        # loads every stored entry into tt; returns how many
+        count = 0
+        for table, key, depth, value, best_move in self.connection.execute("SELECT tbl, key, depth, value, best_move FROM entries"):
+            best_move = ast.literal_eval(best_move)
+            if table == 'ab':
+                tt.ab_store(to_unsigned(key), depth, value, best_move, EXACT, None, None)
+            else:
+                tt.mm_store(to_unsigned(key), depth, value, best_move)
+            count += 1
+        return count
+
+    def save(self, tt, min_depth=MIN_DEPTH):
+        # keeps tt's EXACT entries searched at least min_depth deep (deeper entries win); returns how many
+        rows = [(table, to_signed(key), depth, value, repr(best_move))
+                for table, key, (depth, value, best_move, flag) in tt.items()
+                if flag == EXACT and depth >= min_depth and type(key) is int]
+        self.connection.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (tbl, key) DO UPDATE SET "
+                                    "depth = excluded.depth, value = excluded.value, best_move = excluded.best_move "
+                                    "WHERE excluded.depth > entries.depth", rows)
+        self.connection.commit()
+        return len(rows)
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from negamax import game_protocol
+from minimax import minimax
+from alphabeta import alphabeta
+from transpositiontable import TranspositionTable
+from searchstats import SearchStats
+from scores import INF, score_at_ply, score_from_ply
+
+# per-worker state, set up once per process by init_worker
+shared_value = None   # best root score found so far (root side's point of view)
+shared_index = None   # root move index that scored it
+worker_tt = None
+
+def init_worker(value, index, use_tt):
+    global shared_value, shared_index, worker_tt
+    shared_value = value
+    shared_index = index
+    # one table per worker process, reused across the root moves it searches
+    worker_tt = TranspositionTable() if use_tt else None
+
+def search_root_move(game, depth, game_size, maximizingPlayer, search, move_index, move, detailed):
+    color = 1 if maximizingPlayer else -1
+    protocol = game_protocol(game, game_size)
+    # extra turn ==> the root side moves again
+    child_maximizing = maximizingPlayer if protocol.play(move, color) else not maximizingPlayer
+    node_counter = SearchStats(detailed)
+
+    if search is minimax:
+        _, value = minimax(game, depth - 1, game_size, child_maximizing, node_counter, worker_tt)
+        # the child search counts forced results from the child, one ply below the root
+        return move_index, score_at_ply(color * value, 1), -INF, node_counter
+
+    # lower bound for this move: it only matters if it beats the best move so far, or ties it from
+    # an earlier index (scores are integers, so "ties" means > bound - 1); this keeps the merged
+    # answer identical to a sequential left-to-right search whatever order the workers finish in
+    with shared_value.get_lock():
+        bound = shared_value.value
+        bound_index = shared_index.value
+    if bound == -INF:
+        alpha = -INF
+    elif move_index > bound_index:
+        alpha = bound
+    else:
+        alpha = bound - 1
+
+    # child search sees the window from the maximizer's point of view, with forced results counted
+    # from the child (one ply below the root)
+    child_alpha = score_from_ply(alpha, 1) if alpha != -INF else -INF
+    if maximizingPlayer:
+        _, value = search(game, depth - 1, game_size, child_alpha, INF, child_maximizing, node_counter, worker_tt)
+    else:
+        _, value = search(game, depth - 1, game_size, -INF, -child_alpha, child_maximizing, node_counter, worker_tt)
+    score = score_at_ply(color * value, 1)
+
+    if score > alpha:
+        with shared_value.get_lock():
+            if score > shared_value.value or (score == shared_value.value and move_index < shared_index.value):
+                shared_value.value = score
+                shared_index.value = move_index
+    return move_index, score, alpha, node_counter
+
+def parallel_root_search(game, depth, game_size, maximizingPlayer, node_counter, search=alphabeta,
+                         use_tt=False, workers=None):
+    # root splitting: each root move is searched in a worker process, sharing the best score so far
+    # as a pruning bound; returns (best move, value) from the maximizer's point of view like the
+    # sequential searches, with node counts summed over all workers
+    node_counter.nodes += 1
+    if node_counter.enabled:
+        node_counter.nodes_by_depth[depth] += 1
+    protocol = game_protocol(game, game_size)
+    color = 1 if maximizingPlayer else -1
+    result = protocol.outcome(color)
+    if depth == 0 or result is not None:
+        return None, color * (result if result is not None else protocol.evaluate(color))
+    valid_moves = protocol.moves()
+    if not valid_moves:
+        return None, color * protocol.evaluate(color)
+
+    value = multiprocessing.Value('i', -INF)
+    index = multiprocessing.Value('i', len(valid_moves))
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=min(workers, len(valid_moves)), initializer=init_worker,
+                             initargs=(value, index, use_tt)) as pool:
+        futures = [pool.submit(search_root_move, game, depth, game_size, maximizingPlayer, search, move_index, move,
+                               node_counter.enabled)
+                   for move_index, move in enumerate(valid_moves)]
+        results = [future.result() for future in futures]
+
+    # deterministic merge: highest exact score, earliest move on ties (fail-lows can't be best)
+    best_move = valid_moves[0]
+    best_score = -INF
+    for move_index, score, alpha, worker_stats in results:
+        node_counter.merge(worker_stats)
+        if score > alpha and score > best_score:
+            best_score = score
+            best_move = valid_moves[move_index]
+    return best_move, color * best_score
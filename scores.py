@@ -0,0 +1,41 @@
+# integer score domain shared by every search. heuristic scores are small integers; forced results
+# count their distance: the side to move wins in n plies ==> WIN - n, loses in n plies ==> n - WIN,
+# so a faster win (or a slower loss) scores higher. INF is only a window bound, never a score.
+# everything fits the 32-bit values of the packed tables
+WIN = 1000000
+INF = WIN + 1
+# no search goes deeper than this, so every score past +-MATE is a forced result
+MAX_PLY = 1000
+MATE = WIN - MAX_PLY
+# an exact result whose distance isn't known (a tablebase or nim solver verdict) stays just below the
+# mate band: it beats any heuristic score, but a counted mate beats it and it never counts a distance
+PROVEN_WIN = MATE - 1
+# a heuristic's verdict (nim's nim-sum) stays below that: it beats any other heuristic score but is
+# never counted as a distance or read as a proven result. only terminal positions score +-WIN
+KNOWN_WIN = PROVEN_WIN - 1
+
+def is_mate(value):
+    return value >= MATE or value <= -MATE
+
+def within_depth(value, depth):
+    # a stored value (counted from its own node) a depth-ply search could have found itself: a forced
+    # result further away came from a deeper search, and using it would make the value depend on the table
+    return -MATE < value < MATE or WIN - abs(value) <= depth
+
+def score_at_ply(value, ply):
+    # a forced result counted from a node ply plies below the root ==> counted from the root
+    # (heuristic scores pass through)
+    if value >= MATE:
+        return value - ply
+    if value <= -MATE:
+        return value + ply
+    return value
+
+def score_from_ply(value, ply):
+    # the inverse: transposition entries count forced results from their own node, so they stay
+    # right when the position is reached at another ply or from another root
+    if value >= MATE:
+        return value + ply
+    if value <= -MATE:
+        return value - ply
+    return value
@@ -3,33 +3,70 @@ from connectfour import ConnectFour, PLAYER1, PLAYER2
 from dotsandboxes import DotsAndBoxes
 from nim import Nim
 from minimax import apply_move, undo_move
+from alphabeta import order_tt_move
+from negamax import negamax
+from nimsolver import solver_for
 from transpositiontable import TranspositionTable, EXACT, LOWERBOUND, UPPERBOUND
-
-def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt):
-    node_counter['nodes'] += 1
-    state_key = game.get_state_key(maximizingPlayer)
+from scores import WIN, INF, score_at_ply
+
+def leaf_value(game, maximizingPlayer):
+    # scout scores for the maximizer; evaluate does so for nim, but scores the other games for the side to move
+    value = evaluate(game, maximizingPlayer)
+    return value if maximizingPlayer or isinstance(game, Nim) else -value
+
+def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt, orderer=None, ply=0):
+    # ply: distance from the root, so forced results can count it (see scores)
+    node_counter.nodes += 1
+    detailed = node_counter.enabled
+    if detailed:
+        node_counter.nodes_by_depth[depth] += 1
+        if tt is not None:
+            node_counter.watch(tt)
+    # mate distance pruning: no line from here ends sooner than this ply (see negamax)
+    alpha = max(alpha, ply - WIN)
+    beta = min(beta, WIN - ply)
+    if alpha >= beta:
+        return None, alpha
+    # incremental zobrist hash, only needed when a transposition table is in use
+    state_key = game.get_hash(maximizingPlayer) if tt is not None else None
     original_alpha = alpha
     original_beta = beta
 
     # transposition table (if specified) lookup
+    tt_move = None
     if tt is not None:
-        found, tt_move, tt_value = tt.ab_lookup(state_key, depth, alpha, beta)
+        found, tt_move, tt_value = tt.ab_lookup(state_key, depth, alpha, beta, ply)
         if found:
             return tt_move, tt_value
 
     # are we at terminal node / did we reach depth limit?
     is_terminal = game.is_terminal_node()
-    winner = game.get_winner(maximizingPlayer)
+    # did the maximizer win: nim's get_winner takes the side to move, the other games the player asked about
+    winner = game.get_winner(maximizingPlayer if isinstance(game, Nim) else True)
     if depth == 0 or is_terminal:
+        if detailed:
+            node_counter.leaves += 1
         if winner is not None:
             if winner:
-                return (None, float('inf'))
+                return (None, WIN - ply)
             elif winner is False:
-                return (None, float('-inf'))
+                return (None, ply - WIN)
             else:
                 return (None, 0)  # Draw
         else:
-            return (None, evaluate(game, maximizingPlayer))
+            # endgame tablebase (if attached to the game) scores for the side to move
+            tablebase = getattr(game, 'tablebase', None)
+            if tablebase is not None and tablebase.covers(game, game_size):
+                exact = tablebase.probe(game, 1 if maximizingPlayer else -1)
+                if exact is not None:
+                    return (None, exact if maximizingPlayer else -exact)
+            # nim solver oracle (if attached): the exact verdict for the side to move, the maximizer on nim
+            if getattr(game, 'oracle', False):
+                exact = solver_for(game, game_size).value(game.heaps)
+                return (None, exact if maximizingPlayer else -exact)
+            if detailed:
+                node_counter.evaluations += 1
+            return (None, score_at_ply(leaf_value(game, maximizingPlayer), ply))
 
     # get valid moves
     if isinstance(game, Nim):
@@ -38,7 +75,16 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
         valid_moves = game.get_valid_moves()
 
     if not valid_moves:
-        return None, evaluate(game, maximizingPlayer)
+        if detailed:
+            node_counter.leaves += 1
+            node_counter.evaluations += 1
+        return None, score_at_ply(leaf_value(game, maximizingPlayer), ply)
+
+    # move ordering: tt move, killers, history and game priors (if specified), else just the tt move
+    if orderer is not None:
+        valid_moves = orderer.order(game, valid_moves, depth, tt_move)
+    else:
+        order_tt_move(valid_moves, tt_move)
 
     best_move = None
     first_move = True
@@ -52,13 +98,13 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                 move_flag = LOWERBOUND
             else:
                 move_flag = EXACT
-            tt.ab_store(state_key, depth, value, move, move_flag, original_alpha, original_beta)
+            tt.ab_store(state_key, depth, value, move, move_flag, original_alpha, original_beta, ply)
 
     # slightly altered approach from alpha-beta pruning (based on first move or not)
     if maximizingPlayer:
-        baseline_value = float('-inf')
+        baseline_value = -INF
 
-        for move in valid_moves:
+        for move_index, move in enumerate(valid_moves):
 
             # apply move
             if hasattr(game, 'set_current_player'):
@@ -69,7 +115,7 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                 # full (initial) search for the first move
                 first_move = False
 
-                full_best_move, score = scout(game, depth - 1, game_size, alpha, beta, False, node_counter, tt)
+                full_best_move, score = scout(game, depth - 1, game_size, alpha, beta, False, node_counter, tt, orderer, ply + 1)
 
                 # undo move
                 undo_move(game, move, maximizingPlayer)
@@ -82,25 +128,32 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                 store_tt_result(baseline_value, best_move)
 
                 if alpha >= beta:
+                    if detailed:
+                        node_counter.cutoffs_by_index[move_index] += 1
+                    if orderer is not None:
+                        orderer.record_cutoff(move, depth, move_index)
                     break
             else:
                 # re-search (using null window) --> no need to store in transposition table
                 verify_alpha = baseline_value
                 verify_beta = baseline_value + 1
-                _, verify_score = scout(game, depth - 1, game_size, verify_alpha, verify_beta, False, node_counter, None)
+                _, verify_score = scout(game, depth - 1, game_size, verify_alpha, verify_beta, False, node_counter, None, orderer, ply + 1)
 
                 # undo move
                 undo_move(game, move, maximizingPlayer)
 
-                # if verify suggests equal or better move, re-search fully with original window
-                if verify_score >= baseline_value:
+                # if verify fails high (a better move), re-search fully with original window; scores are
+                # integers, so the null window (baseline, baseline + 1) settles ties without a re-search
+                if verify_score >= verify_beta:
+                    if detailed:
+                        node_counter.researches += 1
                     # re-apply move
                     if hasattr(game, 'set_current_player'):
                         game.set_current_player(PLAYER1 if maximizingPlayer else PLAYER2)
                     apply_move(game, move, maximizingPlayer)
 
                     # recurse
-                    _, full_score = scout(game, depth - 1, game_size, alpha, beta, False, node_counter, tt)
+                    _, full_score = scout(game, depth - 1, game_size, alpha, beta, False, node_counter, tt, orderer, ply + 1)
 
                     # undo again
                     undo_move(game, move, maximizingPlayer)
@@ -112,16 +165,18 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                         # Store updated full search result in TT
                         store_tt_result(baseline_value, best_move)
                         if alpha >= beta:
+                            if detailed:
+                                node_counter.cutoffs_by_index[move_index] += 1
+                            if orderer is not None:
+                                orderer.record_cutoff(move, depth, move_index)
                             break
 
         final_value = baseline_value
-        if final_value == float('-inf'):
-            best_move = None
 
     else:
-        baseline_value = float('inf')
+        baseline_value = INF
 
-        for move in valid_moves:
+        for move_index, move in enumerate(valid_moves):
             # apply move
             if hasattr(game, 'set_current_player'):
                 game.set_current_player(PLAYER1 if maximizingPlayer else PLAYER2)
@@ -131,7 +186,7 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                 # full (initial) search for the first move
                 first_move = False
 
-                full_best_move, score = scout(game, depth - 1, game_size, alpha, beta, True, node_counter, tt)
+                full_best_move, score = scout(game, depth - 1, game_size, alpha, beta, True, node_counter, tt, orderer, ply + 1)
 
                 # undo move
                 undo_move(game, move, maximizingPlayer)
@@ -144,18 +199,24 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                 store_tt_result(baseline_value, best_move)
 
                 if beta <= alpha:
+                    if detailed:
+                        node_counter.cutoffs_by_index[move_index] += 1
+                    if orderer is not None:
+                        orderer.record_cutoff(move, depth, move_index)
                     break
             else:
                 # verification search (null-window) - no TT store
                 verify_alpha = baseline_value - 1
                 verify_beta = baseline_value
-                _, verify_score = scout(game, depth - 1, game_size, verify_alpha, verify_beta, True, node_counter, None)
+                _, verify_score = scout(game, depth - 1, game_size, verify_alpha, verify_beta, True, node_counter, None, orderer, ply + 1)
 
                 # undo move
                 undo_move(game, move, maximizingPlayer)
 
-                # re-search fully if verify says there might be a better move in this branch than the one we found
-                if verify_score <= baseline_value:
+                # re-search fully if verify fails low (a better move for the minimizer than the one we found)
+                if verify_score <= verify_alpha:
+                    if detailed:
+                        node_counter.researches += 1
 
                     # apply move
                     if hasattr(game, 'set_current_player'):
@@ -163,7 +224,7 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                     apply_move(game, move, maximizingPlayer)
 
                     # recurse
-                    _, full_score = scout(game, depth - 1, game_size, alpha, beta, True, node_counter, tt)
+                    _, full_score = scout(game, depth - 1, game_size, alpha, beta, True, node_counter, tt, orderer, ply + 1)
 
                     # undo again
                     undo_move(game, move, maximizingPlayer)
@@ -177,10 +238,20 @@ def scout(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, t
                         # store updated full-search in transposition table (if specified)
                         store_tt_result(baseline_value, best_move)
                         if beta <= alpha:
+                            if detailed:
+                                node_counter.cutoffs_by_index[move_index] += 1
+                            if orderer is not None:
+                                orderer.record_cutoff(move, depth, move_index)
                             break
 
         final_value = baseline_value
-        if final_value == float('inf'):
-            best_move = None
 
     return best_move, final_value
+
+def pvs(game, depth, game_size, alpha, beta, maximizingPlayer, node_counter, tt, orderer=None):
+    # principal variation search: full window for the first move, null-window probes (sharing the
+    # transposition table) for the rest, re-searching only when a probe fails high strictly inside the window
+    if maximizingPlayer:
+        return negamax(game, depth, game_size, 1, node_counter, tt, alpha, beta, null_window=True, orderer=orderer)
+    best_move, value = negamax(game, depth, game_size, -1, node_counter, tt, -beta, -alpha, null_window=True, orderer=orderer)
+    return best_move, -value
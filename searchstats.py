@@ -0,0 +1,140 @@
+import signal
+import sys
+from collections import Counter
+from transpositiontable import EXACT, LOWERBOUND, UPPERBOUND
+
+FLAG_NAMES = {EXACT: 'exact', LOWERBOUND: 'lower', UPPERBOUND: 'upper'}
+
+class SearchStats:
+    # search statistics passed down every search in place of the old {'nodes': 0} dict
+    # (stats['nodes'] still works). the node count is always kept; everything else only when
+    # enabled, so a disabled object costs one attribute increment per node
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.nodes = 0
+        self.nodes_by_depth = Counter()   # by remaining depth
+        self.leaves = 0                   # nodes scored without expanding: terminal, depth 0, no moves
+        self.evaluations = 0              # heuristic evaluate() calls
+        self.cutoffs_by_index = Counter() # beta cutoffs by the index of the move that caused them
+        self.researches = 0               # null-window probes that had to be searched again
+        # transposition table counters as of the first probe of this search, per table
+        self.tables = {}
+        # tt counts of tables that live in other processes
+        self.tt_counts = {'probes': 0, 'hits': 0, 'cutoffs': {}}
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def watch(self, tt):
+        # count tt probes/hits/cutoffs from here on (only the first call per table counts)
+        if id(tt) not in self.tables:
+            self.tables[id(tt)] = (tt, tt.hits, tt.misses, list(tt.cutoffs))
+
+    def tt_stats(self):
+        # probes, hits (an entry was found) and cutoffs (the entry answered the node) by flag
+        probes = self.tt_counts['probes']
+        hits = self.tt_counts['hits']
+        cutoffs = Counter(self.tt_counts['cutoffs'])
+        for tt, start_hits, start_misses, start_cutoffs in self.tables.values():
+            hits += tt.hits - start_hits
+            probes += tt.hits - start_hits + tt.misses - start_misses
+            for flag, (now, start) in enumerate(zip(tt.cutoffs, start_cutoffs)):
+                cutoffs[FLAG_NAMES[flag]] += now - start
+        return {'probes': probes, 'hits': hits, 'cutoffs': dict(cutoffs)}
+
+    def merge(self, other):
+        # fold in the stats of a search run elsewhere (worker process, budgeted copy)
+        self.nodes += other.nodes
+        self.nodes_by_depth.update(other.nodes_by_depth)
+        self.leaves += other.leaves
+        self.evaluations += other.evaluations
+        self.cutoffs_by_index.update(other.cutoffs_by_index)
+        self.researches += other.researches
+        for key, table in other.tables.items():
+            self.tables.setdefault(key, table)
+        cutoffs = Counter(self.tt_counts['cutoffs'])
+        cutoffs.update(other.tt_counts['cutoffs'])
+        self.tt_counts = {'probes': self.tt_counts['probes'] + other.tt_counts['probes'],
+                          'hits': self.tt_counts['hits'] + other.tt_counts['hits'], 'cutoffs': dict(cutoffs)}
+
+    def __getstate__(self):
+        # tables stay with the process that owns them, their counts travel as plain numbers
+        state = dict(self.__dict__)
+        state['tables'] = {}
+        state['tt_counts'] = self.tt_stats()
+        return state
+
+    def summary(self):
+        lines = []
+        if self.nodes_by_depth:
+            lines.append(f"Nodes by depth: {', '.join(f'{depth}: {count}' for depth, count in sorted(self.nodes_by_depth.items(), reverse=True))}")
+        lines.append(f"Leaves: {self.leaves}, evaluations: {self.evaluations}, re-searches: {self.researches}")
+        cutoffs = sum(self.cutoffs_by_index.values())
+        if cutoffs:
+            first = self.cutoffs_by_index.get(0, 0)
+            by_index = ', '.join(f'{index}: {count}' for index, count in sorted(self.cutoffs_by_index.items()))
+            lines.append(f"Beta cutoffs: {cutoffs} ({first / cutoffs:.0%} on the first move; by move index {by_index})")
+        tt = self.tt_stats()
+        if tt['probes']:
+            cutoffs = ', '.join(f"{name} {count}" for name, count in tt['cutoffs'].items())
+            lines.append(f"TT probes: {tt['probes']}, hits: {tt['hits']}, cutoffs: {cutoffs}")
+        return lines
+
+# sampling profiler: each tick of the process cpu timer charges the innermost recognized function on the
+# stack to its category (whatever is left is the search itself: recursion, windows, tt, ordering)
+CATEGORIES = {
+    'moves': 'move generation', 'get_valid_moves': 'move generation', 'get_macro_moves': 'move generation',
+    'chains': 'move generation', 'find_capture': 'move generation',
+    'play': 'make/undo', 'undo': 'make/undo', 'make_move': 'make/undo', 'undo_move': 'make/undo',
+    'make_macro_move': 'make/undo', 'undo_macro_move': 'make/undo', 'apply_move': 'make/undo', 'set_current_player': 'make/undo',
+    'outcome': 'terminal checks', 'check_win': 'terminal checks', 'is_full': 'terminal checks',
+    'is_terminal_node': 'terminal checks', 'get_winner': 'terminal checks',
+    'evaluate': 'evaluate', 'evaluate_connect_four': 'evaluate', 'evaluate_nim': 'evaluate',
+    'evaluate_dots_and_boxes': 'evaluate',
+}
+
+class SamplingProfiler:
+    # with SamplingProfiler() as profiler: ...search...; then profiler.summary()
+    # (unix only, main thread only: uses setitimer/SIGPROF)
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = Counter()
+
+    def sample(self, signum, frame):
+        while frame is not None:
+            category = CATEGORIES.get(frame.f_code.co_name)
+            if category is not None:
+                self.samples[category] += 1
+                return
+            frame = frame.f_back
+        self.samples['search'] += 1
+
+    def start(self):
+        if not hasattr(signal, 'setitimer'):
+            print("sampling profiler needs setitimer (unix)", file=sys.stderr)
+            return
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.previous)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def summary(self):
+        total = sum(self.samples.values())
+        if not total:
+            return ["Profile: no samples"]
+        return [f"Profile ({total} samples): " +
+                ', '.join(f"{category} {count / total:.0%}" for category, count in self.samples.most_common())]
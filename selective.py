@@ -0,0 +1,191 @@
+import random
+import time
+from iterativedeepening import BudgetCounter, SearchTimeout, MAX_ITERATIONS
+from negamax import game_protocol
+from transpositiontable import TranspositionTable, EXACT, LOWERBOUND, UPPERBOUND
+from scores import WIN, INF, is_mate, score_at_ply
+
+# node budget when neither a node nor a time budget is given
+DEFAULT_NODES = 20000
+# beam: moves kept (best static score first) at the last ply; each further ply of remaining depth
+# widens the beam by WIDENING, so nodes near the root see more of their moves
+BEAM = 4
+WIDENING = 2
+# late-move reductions: after the first LMR_MOVES moves, nodes with at least LMR_DEPTH plies left
+# search the rest one ply shallower with a null window, and again at full depth only if they beat alpha
+LMR_MOVES = 3
+LMR_DEPTH = 3
+
+class SelectiveSearch:
+    # alpha-beta over the game protocol, searching only the most promising moves at each node
+    def __init__(self, game, game_size, counter, tt, seed=0, beam=BEAM, widening=WIDENING, reductions=True):
+        self.protocol = game_protocol(game, game_size)
+        self.counter = counter
+        self.tt = tt
+        self.rng = random.Random(seed)
+        self.beam = beam
+        self.widening = widening
+        self.reductions = reductions
+        # moves currently applied, so an aborted search can be unwound
+        self.line = []
+        # coverage: legal moves at expanded nodes vs the ones actually searched
+        self.expanded = 0
+        self.available = 0
+        self.searched = 0
+        self.reduced = 0
+        self.researched = 0
+        # positions scored at the depth limit in the current iteration (none ==> the tree is resolved)
+        self.frontier = 0
+
+    def play(self, move, color):
+        self.line.append(move)
+        return self.protocol.play(move, color)
+
+    def undo(self, move):
+        self.line.pop()
+        self.protocol.undo(move)
+
+    def unwind(self):
+        while self.line:
+            self.undo(self.line[-1])
+
+    def ranked_moves(self, valid_moves, color):
+        # best static score for the side to move first; ties broken by the seeded generator
+        evaluate = self.protocol.evaluate
+        ranked = []
+        for move in valid_moves:
+            if self.play(move, color):
+                score = evaluate(color)
+            else:
+                score = -evaluate(-color)
+            self.undo(move)
+            ranked.append((-score, self.rng.random(), move))
+        ranked.sort(key=lambda entry: entry[:2])
+        return [move for _, _, move in ranked]
+
+    def width(self, depth):
+        if self.beam is None:
+            return None
+        return self.beam + self.widening * (depth - 1)
+
+    def search(self, depth, alpha, beta, color):
+        self.counter.nodes += 1
+        protocol = self.protocol
+
+        # reductions skip depths, so the distance from the root is the line played so far
+        ply = len(self.line)
+        # mate distance pruning (see negamax)
+        alpha = max(alpha, ply - WIN)
+        beta = min(beta, WIN - ply)
+        if alpha >= beta:
+            return None, alpha
+        original_alpha = alpha
+
+        tt_move = None
+        state_key = protocol.key(color)
+        found, tt_move, tt_value = self.tt.ab_lookup(state_key, depth, alpha, beta, ply)
+        if found:
+            return tt_move, tt_value
+
+        result = protocol.outcome(color)
+        if result is not None:
+            return None, score_at_ply(result, ply)
+        if depth == 0:
+            self.frontier += 1
+            return None, score_at_ply(protocol.evaluate(color), ply)
+        valid_moves = protocol.moves()
+        if not valid_moves:
+            return None, score_at_ply(protocol.evaluate(color), ply)
+
+        # progressive widening: keep the best width(depth) moves, plus the table's move from a
+        # shallower iteration
+        moves = self.ranked_moves(valid_moves, color)
+        width = self.width(depth)
+        if width is not None and len(moves) > width:
+            kept = moves[:width]
+            if tt_move is not None and tt_move in moves and tt_move not in kept:
+                kept.append(tt_move)
+            moves = kept
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        self.expanded += 1
+        self.available += len(valid_moves)
+        self.searched += len(moves)
+
+        value = -INF
+        best_move = None
+        for move_index, move in enumerate(moves):
+            if self.play(move, color):
+                # extra turn: the same side moves again, so no negation
+                score = self.search(depth - 1, alpha, beta, color)[1]
+            elif self.reductions and move_index >= LMR_MOVES and depth >= LMR_DEPTH and alpha != -INF:
+                self.reduced += 1
+                score = -self.search(depth - 2, -alpha - 1, -alpha, -color)[1]
+                if score > alpha:
+                    self.researched += 1
+                    score = -self.search(depth - 1, -beta, -alpha, -color)[1]
+            else:
+                score = -self.search(depth - 1, -beta, -alpha, -color)[1]
+            self.undo(move)
+
+            if score > value:
+                value = score
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if value <= original_alpha:
+            flag = UPPERBOUND
+        elif value >= beta:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        self.tt.ab_store(state_key, depth, value, best_move, flag, original_alpha, beta, ply)
+        return best_move, value
+
+    def coverage(self):
+        return self.searched / self.available if self.available else 1.0
+
+def selective_search(game, game_size, maximizingPlayer, node_counter, node_limit=None, time_limit=None, seed=0,
+                     beam=BEAM, widening=WIDENING, reductions=True, max_depth=MAX_ITERATIONS, tt=None):
+    # anytime selective search: iterative deepening within a node and/or time budget, reusing the
+    # transposition table across depths. the same seed and node budget always give the same answer.
+    # returns the best move and value of the deepest completed iteration (maximizer's point of view)
+    # and a coverage report
+    color = 1 if maximizingPlayer else -1
+    if node_limit is None and time_limit is None:
+        node_limit = DEFAULT_NODES
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    counter = BudgetCounter(node_limit, deadline, node_counter.enabled)
+    tt = tt if tt is not None else TranspositionTable()
+    search = SelectiveSearch(game, game_size, counter, tt, seed, beam, widening, reductions)
+
+    valid_moves = search.protocol.moves()
+    best_move = search.ranked_moves(valid_moves, color)[0] if valid_moves else None
+    best_value = None
+    completed_depth = 0
+    for depth in range(1, max_depth + 1):
+        search.frontier = 0
+        try:
+            move, value = search.search(depth, -INF, INF, color)
+        except SearchTimeout:
+            search.unwind()
+            break
+        if move is not None:
+            best_move = move
+        best_value = value
+        completed_depth = depth
+        # proven win/loss (never a heuristic verdict, see iterative_deepening), or every line already ends
+        # before the depth limit
+        if is_mate(value) or search.frontier == 0:
+            break
+
+    node_counter.merge(counter)
+    report = {'depth': completed_depth, 'nodes': counter.nodes, 'coverage': search.coverage(),
+              'expanded': search.expanded, 'reduced': search.reduced, 'researched': search.researched}
+    if best_value is not None and not maximizingPlayer:
+        best_value = -best_value
+    return best_move, best_value, report
@@ -0,0 +1,235 @@
+import mmap
+import struct
+import sys
+from array import array
+from connectfour import ConnectFour, BitboardConnectFour, PLAYER1, PLAYER2, has_four
+from dotsandboxes import DotsAndBoxes
+from nim import Nim
+from nimsolver import SUBTRACTION_SETS
+from scores import PROVEN_WIN
+
+# file layout: 16-byte header, then count int8 values, position i at byte i (perfect index)
+# values are for the side to move: nim/connectfour 1 win, 0 draw, -1 loss; dotsandboxes the net
+# number of boxes the side to move still wins from here with best play
+HEADER = struct.Struct('<4sBBBBQ')   # magic, game, three game parameters, count
+MAGIC = b'TBL2'
+NIM, DOTS_AND_BOXES, CONNECT_FOUR = 1, 2, 3
+SIZES = {'small': 0, 'medium': 1, 'large': 2}
+
+def write_tablebase(path, game, params, values):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, game, *params, len(values)))
+        values.tofile(f)
+
+# nim: index = sum of heap_i * (max_heap + 1)^i, every move lowers the index, so solving in
+# increasing index order always finds the successors solved
+def build_nim(path, heap_count, max_heap, game_size):
+    subtraction = SUBTRACTION_SETS.get(game_size)
+    radix = max_heap + 1
+    values = array('b', bytes(radix ** heap_count))
+    for index in range(len(values)):
+        value = -1   # no move (all heaps empty) ==> the side to move has lost
+        place = 1
+        rest = index
+        for _ in range(heap_count):
+            heap = rest % radix
+            rest //= radix
+            removals = range(1, heap + 1) if subtraction is None else [k for k in subtraction if k <= heap]
+            for remove in removals:
+                if values[index - remove * place] == -1:
+                    value = 1
+                    break
+            if value == 1:
+                break
+            place *= radix
+        values[index] = value
+    write_tablebase(path, NIM, (heap_count, max_heap, SIZES[game_size]), values)
+
+# dotsandboxes: index = the filled-line mask (DotsAndBoxes.line_mask); a move sets a bit, so solving
+# from the full board down to the empty one always finds the successors solved. box ownership
+# doesn't change what is still to win, so the net future boxes only depend on the mask
+def build_dots_and_boxes(path, size, extra_turn):
+    game = DotsAndBoxes(True, {2: 'small', 3: 'medium', 4: 'large'}[size])
+    lines = [('h', i, j) for i in range(size + 1) for j in range(size)] + \
+            [('v', i, j) for i in range(size) for j in range(size + 1)]
+    bit = {line: 1 << n for n, line in enumerate(lines)}
+    box_masks = [bit[('h', r, c)] | bit[('h', r + 1, c)] | bit[('v', r, c)] | bit[('v', r, c + 1)]
+                 for r in range(size) for c in range(size)]
+    # per line: (its bit, masks of the boxes it borders)
+    line_boxes = [(bit[line], [box_masks[r * size + c] for r, c in game.adjacent_boxes(line)]) for line in lines]
+
+    full = (1 << len(lines)) - 1
+    values = array('b', bytes(full + 1))
+    for mask in range(full - 1, -1, -1):
+        best = None
+        for line_bit, boxes in line_boxes:
+            if mask & line_bit:
+                continue
+            child = mask | line_bit
+            completed = sum(child & box == box for box in boxes)
+            if extra_turn and completed:
+                value = completed + values[child]
+            else:
+                value = completed - values[child]
+            if best is None or value > best:
+                best = value
+        values[mask] = best
+    write_tablebase(path, DOTS_AND_BOXES, (size, int(extra_turn), 0), values)
+
+# connectfour: every board the columns can hold, reachable by alternating moves or not (a random
+# board puts player1 a piece ahead with player1 to move), with either side to move. a column of n
+# pieces whose player1 pieces are the bits of p (bit r = r rows above the bottom) has code 2^n - 1 + p,
+# a board the index sum(code_c * radix^c) with radix = 2^(rows + 1) - 1, and the position with color to
+# move sits at 2 * board + (color == PLAYER1). a move raises one column's code, so solving from the
+# highest board down always finds the successors solved
+def connect_four_columns(rows):
+    # per column code: (pieces, player1 bits, player2 bits, code after a player1 move, after a player2 move)
+    columns = []
+    for pieces in range(rows + 1):
+        for pattern in range(1 << pieces):
+            above = (1 << (pieces + 1)) - 1
+            after = (above + (pattern | 1 << pieces), above + pattern) if pieces < rows else None
+            columns.append((pieces, pattern, ~pattern & ((1 << pieces) - 1), after))
+    return columns
+
+def build_connect_four(path, rows, cols):
+    height = rows + 1
+    radix = (1 << height) - 1
+    columns = connect_four_columns(rows)
+    places = [radix ** col for col in range(cols)]
+    boards = radix ** cols
+    values = array('b', bytes(2 * boards))
+    for board in range(boards - 1, -1, -1):
+        player1_mask = player2_mask = 0
+        moves = []
+        rest = board
+        for col in range(cols):
+            _, player1_bits, player2_bits, after = columns[rest % radix]
+            if after is not None:
+                moves.append((places[col], after[0] - rest % radix, after[1] - rest % radix))
+            player1_mask |= player1_bits << (col * height)
+            player2_mask |= player2_bits << (col * height)
+            rest //= radix
+        player1_four = has_four(player1_mask, height)
+        player2_four = has_four(player2_mask, height)
+        for color in (PLAYER1, PLAYER2):
+            if player1_four or player2_four:
+                # already decided (the searches stop here before probing)
+                value = 1 if (player1_four if color == PLAYER1 else player2_four) else -1
+            else:
+                # full board ==> draw
+                value = -1 if moves else 0
+                for place, player1_step, player2_step in moves:
+                    if color == PLAYER1:
+                        child = 2 * (board + player1_step * place)
+                    else:
+                        child = 2 * (board + player2_step * place) + 1
+                    if values[child] == -1:
+                        value = 1
+                        break
+                    value = max(value, -values[child])
+            values[2 * board + (color == PLAYER1)] = value
+    write_tablebase(path, CONNECT_FOUR, (rows, cols, 0), values)
+
+def board_masks(game):
+    # BitboardConnectFour layout for a list-of-lists board
+    if isinstance(game, BitboardConnectFour):
+        return game.player1_mask, game.player2_mask
+    player1_mask = player2_mask = 0
+    height = game.rows + 1
+    for col in range(game.cols):
+        for r in range(game.rows):
+            cell = game.board[game.rows - 1 - r][col]
+            if cell == PLAYER1:
+                player1_mask |= 1 << (col * height + r)
+            elif cell == PLAYER2:
+                player2_mask |= 1 << (col * height + r)
+    return player1_mask, player2_mask
+
+class Tablebase:
+    # read-only, memory-mapped: probes read straight from the page cache, so every process that opens
+    # the same file shares one copy
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.game, *params, self.count = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tablebase (or one of an older format: build it again)")
+        self.params = tuple(params)
+        self.values = memoryview(self.map)[HEADER.size:].cast('b')
+
+    def __getstate__(self):
+        # worker processes reopen the file instead of copying the table
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def close(self):
+        self.values.release()
+        self.map.close()
+
+    def covers(self, game, game_size):
+        # whether this table was built for the game's variant and board size
+        if self.game == NIM:
+            heap_count, max_heap, size = self.params
+            return isinstance(game, Nim) and len(game.heaps) == heap_count and size == SIZES[game_size]
+        if self.game == DOTS_AND_BOXES:
+            size, extra_turn, _ = self.params
+            return isinstance(game, DotsAndBoxes) and game.size == size and game.extra_turn == bool(extra_turn)
+        rows, cols, _ = self.params
+        return isinstance(game, ConnectFour) and game.rows == rows and game.cols == cols
+
+    def probe(self, game, color):
+        # exact result for the side to move (color), or None if the position isn't in the table; only call
+        # for games the table covers. the table knows who wins but not how soon, so a win scores PROVEN_WIN:
+        # above every heuristic score, below every counted mate (see scores)
+        if self.game == NIM:
+            _, max_heap, _ = self.params
+            index = 0
+            for heap in reversed(game.heaps):
+                if heap > max_heap:
+                    return None
+                index = index * (max_heap + 1) + heap
+            return PROVEN_WIN if self.values[index] > 0 else -PROVEN_WIN
+        if self.game == DOTS_AND_BOXES:
+            final = game.box_count[color] - game.box_count[-color] + self.values[game.line_mask]
+            return PROVEN_WIN if final > 0 else -PROVEN_WIN if final < 0 else 0
+        rows, cols, _ = self.params
+        height = rows + 1
+        radix = (1 << height) - 1
+        column = (1 << rows) - 1
+        player1_mask, player2_mask = board_masks(game)
+        board = 0
+        for col in reversed(range(cols)):
+            pieces = bin(((player1_mask | player2_mask) >> (col * height)) & column).count('1')
+            board = board * radix + (1 << pieces) - 1 + ((player1_mask >> (col * height)) & column)
+        value = self.values[2 * board + (color == PLAYER1)]
+        return PROVEN_WIN if value > 0 else -PROVEN_WIN if value < 0 else 0
+
+USAGE = """Usage: python tablebase.py [connectfour|nim|dotsandboxes] [small/medium/large] OUTPUT [--max-heap=N] [--extra-turn]
+    nim: heaps of up to N objects (default 7), small = removals of 1-3
+    dotsandboxes: --extra-turn for the move-again-on-capture rules (small builds in seconds, medium takes hours)
+    connectfour: small (4x4) only"""
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[2] not in SIZES:
+        print(USAGE)
+        sys.exit(1)
+    game_choice, game_size, path = sys.argv[1].lower().replace('_', ''), sys.argv[2], sys.argv[3]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[4:])
+    if game_choice == 'nim':
+        heap_count = len(Nim(True, game_size).heaps)
+        build_nim(path, heap_count, int(options.get('max-heap') or 7), game_size)
+    elif game_choice == 'dotsandboxes':
+        build_dots_and_boxes(path, DotsAndBoxes(True, game_size).size, 'extra-turn' in options)
+    elif game_choice == 'connectfour' and game_size == 'small':
+        game = ConnectFour(True, game_size)
+        build_connect_four(path, game.rows, game.cols)
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import copy
+import random
+import pytest
+import benchmark
+from main import make_game, parse_options
+from agents import run_agent, agent_settings
+from nim import Nim
+from minimax import minimax, apply_move
+from alphabeta import alphabeta
+from scout import scout, pvs
+from iterativedeepening import iterative_deepening
+from moveordering import MoveOrderer
+from parallelsearch import parallel_root_search
+from negamax import game_protocol
+from lazysmp import lazy_smp_search
+from nimsolver import nim_solver_search
+from tablebase import build_nim, build_dots_and_boxes, build_connect_four, Tablebase
+from mcts import mcts_search
+from selective import selective_search
+from mtdf import windowed_search, MTDF, ASPIRATION
+from transpositiontable import TranspositionTable, REPLACEMENT_SCHEMES
+from searchstats import SearchStats
+from vectorheuristic import EVALUATORS, np
+from scores import INF, MATE, PROVEN_WIN, score_at_ply
+
+# every option must leave the search's value alone: each test searches the same seeded small positions
+# with and without it. moves may differ between equally good ones, so a move is checked by the value
+# plain minimax gives it
+
+POSITIONS = 20
+# fixed search depths on the small boards
+DEPTHS = {'connectfour': 4, 'nim': 5, 'dotsandboxes': 3}
+
+needs_numpy = pytest.mark.skipif(np is None, reason="needs numpy")
+
+def positions(game_choice, game_size='small', options=None, count=POSITIONS):
+    # the initial position and count - 1 seeded random ones
+    games = []
+    for seed in range(count):
+        random.seed(f"test-{game_choice}-{seed}")
+        game, _ = make_game(game_choice, game_size, 'random' if seed else 'initial', options or {})
+        games.append(game)
+    return games
+
+def run(search, game, depth, tt=None, game_size='small', **kwargs):
+    # one search for the maximizer: (move, value)
+    if search is minimax:
+        return minimax(game, depth, game_size, True, SearchStats(), tt)
+    return search(game, depth, game_size, -INF, INF, True, SearchStats(), tt, **kwargs)
+
+def move_value(game, move, depth, game_size='small'):
+    # plain minimax's value of playing the move at the root: the reply searched a ply shallower
+    reply = copy.deepcopy(game)
+    apply_move(reply, move, True)
+    return score_at_ply(minimax(reply, depth - 1, game_size, False, SearchStats(), None)[1], 1)
+
+def check(game_choice, searcher, options=None, game_size='small', count=10):
+    # searcher(game, depth) -> (move, value) on the positions built with the options, against plain
+    # minimax on the same positions built without them
+    depth = DEPTHS[game_choice]
+    built = positions(game_choice, game_size, options, count)
+    plain = positions(game_choice, game_size, None, count)
+    for game, plain_game in zip(built, plain):
+        expected_move, expected = minimax(copy.deepcopy(plain_game), depth, game_size, True, SearchStats(), None)
+        move, value = searcher(game, depth)
+        assert value == expected
+        # (a finished game has no move to compare)
+        if expected_move is not None:
+            assert move_value(plain_game, move, depth, game_size) == expected
+
+@pytest.mark.parametrize('game_size', ['small', 'medium'])
+@pytest.mark.parametrize('search, table', [(minimax, False), (alphabeta, False), (minimax, True), (alphabeta, True)])
+def test_bitboard(search, table, game_size):
+    check('connectfour', lambda game, depth: run(search, game, depth, TranspositionTable() if table else None, game_size),
+          {'bitboard': True}, game_size)
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('search', [minimax, alphabeta])
+def test_table(game_choice, search):
+    check(game_choice, lambda game, depth: run(search, game, depth, TranspositionTable()))
+
+@pytest.mark.parametrize('search', [minimax, alphabeta])
+def test_table_deeper_entries(search):
+    # medium nim reaches the same heaps at different plies: a forced result stored by a deeper search
+    # must not reach past the remaining depth of the node that reads it
+    check('nim', lambda game, depth: run(search, game, depth, TranspositionTable(), 'medium'), game_size='medium')
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('packed', [False, True])
+@pytest.mark.parametrize('scheme', REPLACEMENT_SCHEMES)
+@pytest.mark.parametrize('search', [minimax, alphabeta])
+def test_bounded_table(game_choice, search, scheme, packed):
+    # far too small for the tree: replacements lose entries, never values
+    check(game_choice, lambda game, depth: run(search, game, depth, TranspositionTable(0.01, scheme, packed)))
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('table', [False, True])
+def test_pvs(game_choice, table):
+    check(game_choice, lambda game, depth: run(pvs, game, depth, TranspositionTable() if table else None))
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('table', [False, True])
+def test_scout(game_choice, table):
+    check(game_choice, lambda game, depth: run(scout, game, depth, TranspositionTable() if table else None))
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('search', [alphabeta, pvs, scout])
+def test_iterative_deepening(game_choice, search):
+    # deepening up to the fixed depth through one table ends where the fixed-depth search does
+    check(game_choice, lambda game, depth: iterative_deepening(game, 'small', True, SearchStats(), TranspositionTable(), search,
+                                                                max_depth=depth, orderer=MoveOrderer())[:2])
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('table', [False, True])
+@pytest.mark.parametrize('search', [alphabeta, pvs, scout])
+def test_ordering(game_choice, search, table):
+    check(game_choice, lambda game, depth: run(search, game, depth, TranspositionTable() if table else None, orderer=MoveOrderer()))
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('search, table', [(alphabeta, False), (alphabeta, True), (minimax, True), (pvs, False), (scout, False)])
+def test_parallel(game_choice, search, table):
+    check(game_choice, lambda game, depth: parallel_root_search(game, depth, 'small', True, SearchStats(), search, table, 2), count=3)
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('search', [alphabeta, pvs, scout])
+def test_lazy_smp(game_choice, search):
+    # one process: the main search alone, through the shared-memory table
+    check(game_choice, lambda game, depth: lazy_smp_search(game, depth, 'small', True, SearchStats(), search, 1, 8)[:2])
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_lazy_smp_helpers(game_choice):
+    # helpers search some lines a ply deeper into the same table, so the value may differ from a
+    # fixed-depth search's; the answer is still a legal move
+    for game in positions(game_choice, count=3):
+        moves = game_protocol(game, 'small').moves()
+        move, _, _ = lazy_smp_search(game, DEPTHS[game_choice], 'small', True, SearchStats(), alphabeta, 2, 8)
+        assert move in moves if moves else move is None
+
+def test_dots_and_boxes_counters():
+    # make/undo keep the running counters equal to a full count of the board
+    def assert_counts(game):
+        lines = game.h_lines + game.v_lines
+        assert game.filled_lines == sum(cell != 0 for row in lines for cell in row)
+        for player in [1, 2]:
+            assert game.box_count[player] == sum(row.count(player) for row in game.boxes)
+
+    for game in positions('dotsandboxes', 'medium'):
+        played = []
+        while game.get_valid_moves():
+            move = random.choice(game.get_valid_moves())
+            game.make_move(move)
+            played.append(move)
+            assert_counts(game)
+        while played:
+            game.undo_move(played.pop())
+            assert_counts(game)
+
+@pytest.mark.parametrize('options', [{'extra-turn': True}, {'macro': True}])
+@pytest.mark.parametrize('search, table', [(minimax, True), (alphabeta, False), (alphabeta, True), (pvs, False), (pvs, True)])
+def test_extra_turns(options, search, table):
+    # the same rules on both sides; who moves after a capture depends on the rules, so values only
+    depth = DEPTHS['dotsandboxes']
+    for game in positions('dotsandboxes', options=options, count=10):
+        expected = minimax(copy.deepcopy(game), depth, 'small', True, SearchStats(), None)[1]
+        assert run(search, game, depth, TranspositionTable() if table else None)[1] == expected
+
+@pytest.mark.parametrize('game_choice, game_size', [('connectfour', 'small'), ('connectfour', 'medium'), ('nim', 'small'), ('dotsandboxes', 'small')])
+@pytest.mark.parametrize('search', [minimax, alphabeta, pvs])
+def test_symmetry(game_choice, game_size, search):
+    check(game_choice, lambda game, depth: run(search, game, depth, TranspositionTable(), game_size), {'symmetry': True}, game_size)
+
+@pytest.mark.parametrize('game_size', ['small', 'medium'])
+def test_symmetry_bitboard(game_size):
+    check('connectfour', lambda game, depth: run(alphabeta, game, depth, TranspositionTable(), game_size),
+          {'bitboard': True, 'symmetry': True}, game_size)
+
+def solved(game):
+    # (move, value) of a search deep enough to reach the end of every line
+    return alphabeta(copy.deepcopy(game), sum(game.heaps) + 1, 'small', -INF, INF, True, SearchStats(), TranspositionTable())
+
+def test_nim_solver():
+    # the solver's root answer and its exact leaves agree with a full search on who wins
+    for game in positions('nim'):
+        move, value = solved(game)
+        if move is None:
+            continue
+        solver_move, solver_value = nim_solver_search(copy.deepcopy(game), 'small', True, SearchStats())
+        assert (solver_value > 0) == (value > 0)
+        if value > 0:
+            reply = copy.deepcopy(game)
+            apply_move(reply, solver_move, True)
+            assert alphabeta(reply, sum(reply.heaps) + 1, 'small', -INF, INF, False, SearchStats(), TranspositionTable())[1] > 0
+        for search in [alphabeta, scout]:
+            leaf_game = copy.deepcopy(game)
+            leaf_game.oracle = True
+            assert (run(search, leaf_game, 1)[1] > 0) == (value > 0)
+
+@pytest.fixture(scope='module')
+def tablebases(tmp_path_factory):
+    path = tmp_path_factory.mktemp('tablebase')
+    build_nim(str(path / 'nim.tb'), len(Nim(True, 'small').heaps), 12, 'small')
+    build_dots_and_boxes(str(path / 'dotsandboxes.tb'), 2, False)
+    build_connect_four(str(path / 'connectfour.tb'), 4, 4)
+    return path
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_tablebase(tablebases, game_choice):
+    # exact leaves: even a one-ply search gets the table's win/draw/loss for the root
+    table = Tablebase(str(tablebases / f"{game_choice}.tb"))
+    for game in positions(game_choice):
+        exact = table.probe(game, 1)
+        if game.is_terminal_node() or (exact is None and game_choice == 'nim'):
+            continue
+        # random connectfour boards (player1 a piece ahead and to move) are in the table too
+        assert exact is not None
+        assert abs(exact) in (0, PROVEN_WIN)
+        game.tablebase = table
+        value = run(alphabeta, game, 1)[1]
+        assert (value > 0) - (value < 0) == (exact > 0) - (exact < 0)
+    table.close()
+
+@pytest.mark.parametrize('writer', ['cmp3', 'cmp4', 'cmp5'])
+def test_book(tmp_path, writer):
+    # a book written by any agent, then read by cmp4 at every reply (the minimizer to move, so entries
+    # of both sides' nodes get used)
+    for seed, game in enumerate(positions('connectfour', count=5)):
+        path = str(tmp_path / f"book-{seed}.db")
+        run_agent(copy.deepcopy(game), 4, 'small', writer, {'book': path})
+        for move in game.get_valid_moves():
+            reply = copy.deepcopy(game)
+            apply_move(reply, move, True)
+            result = run_agent(copy.deepcopy(reply), 3, 'small', 'cmp4', {'book': path}, maximizingPlayer=False)
+            assert result.value == alphabeta(reply, 3, 'small', -INF, INF, False, SearchStats(), None)[1]
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_detailed_stats(game_choice):
+    # the detailed counters only watch: same values, same node counts
+    for game in positions(game_choice, count=5):
+        plain, detailed = SearchStats(), SearchStats(True)
+        result = alphabeta(copy.deepcopy(game), DEPTHS[game_choice], 'small', -INF, INF, True, plain, TranspositionTable())
+        assert alphabeta(game, DEPTHS[game_choice], 'small', -INF, INF, True, detailed, TranspositionTable()) == result
+        assert detailed.nodes == plain.nodes
+
+@pytest.mark.parametrize('evaluator', ['incremental', pytest.param('vector', marks=needs_numpy)])
+@pytest.mark.parametrize('bitboard', [False, True])
+@pytest.mark.parametrize('search, table', [(minimax, False), (alphabeta, False), (alphabeta, True)])
+def test_evaluator(evaluator, bitboard, search, table):
+    def searcher(game, depth):
+        game.evaluator = EVALUATORS[evaluator](game)
+        return run(search, game, depth, TranspositionTable() if table else None)
+    check('connectfour', searcher, {'bitboard': True} if bitboard else None)
+
+@needs_numpy
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('search, table, batch_depth', [(alphabeta, False, 2), (alphabeta, True, 2), (minimax, True, 2),
+                                                        (minimax, True, 1), (pvs, False, 2)])
+def test_batch_leaves(game_choice, search, table, batch_depth):
+    def searcher(game, depth):
+        game.batch_leaves = batch_depth
+        return run(search, game, depth, TranspositionTable() if table else None)
+    check(game_choice, searcher)
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_mcts_seed(game_choice):
+    # the same seed and iteration count always pick the same move
+    for game in positions(game_choice, count=5):
+        first = mcts_search(copy.deepcopy(game), 'small', True, SearchStats(), 200, seed=1)
+        assert mcts_search(copy.deepcopy(game), 'small', True, SearchStats(), 200, seed=1) == first
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_selective_seed(game_choice):
+    # the same seed and node budget always pick the same move
+    for game in positions(game_choice, count=5):
+        first = selective_search(copy.deepcopy(game), 'small', True, SearchStats(), node_limit=2000, seed=1)
+        assert selective_search(copy.deepcopy(game), 'small', True, SearchStats(), node_limit=2000, seed=1) == first
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('driver, window', [(MTDF, None), (ASPIRATION, 10), (ASPIRATION, 1)])
+def test_windowed(game_choice, driver, window):
+    # deepening up to the fixed depth with zero or narrow windows ends where the full-window search does
+    check(game_choice, lambda game, depth: windowed_search(game, 'small', True, SearchStats(), TranspositionTable(), driver, depth,
+                                                            window=window)[:2])
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+def test_mate_distance(game_choice):
+    # integer values; a forced result counts its plies, so it is already the fastest one within the
+    # depth and a deeper search finds the same
+    depth = DEPTHS[game_choice]
+    for game in positions(game_choice):
+        shallow = alphabeta(copy.deepcopy(game), depth - 2, 'small', -INF, INF, True, SearchStats(), None)[1]
+        deep = alphabeta(copy.deepcopy(game), depth, 'small', -INF, INF, True, SearchStats(), TranspositionTable())[1]
+        assert isinstance(shallow, int) and isinstance(deep, int)
+        if abs(shallow) >= MATE:
+            assert deep == shallow
+
+FEATURES = [('cmp1', {}), ('cmp2', {}), ('cmp3', {}), ('cmp4', {}), ('cmp5', {}), ('cmp2', {'pvs': True}),
+            ('cmp5', {'pvs': True}), ('cmp4', {'tt-mb': '0.01', 'tt-replace': 'twotier', 'tt-packed': True}),
+            ('cmp4', {'ordering': True}), ('cmp5', {'pvs': True, 'ordering': True}), ('cmp4', {'mtdf': True}),
+            ('cmp1', {'aspiration': True}), ('cmp3', {'workers': '2'}), ('cmp5', {'pvs': True, 'lazysmp': '1'}),
+            ('cmp3', {'symmetry': True}), ('cmp4', {'symmetry': True}), ('cmp5', {'pvs': True, 'symmetry': True}),
+            pytest.param('cmp4', {'batch-leaves': True}, marks=needs_numpy)]
+
+@pytest.mark.parametrize('game_choice', list(DEPTHS))
+@pytest.mark.parametrize('agent, options', FEATURES)
+def test_agent(game_choice, agent, options):
+    # the agents as main.py runs them, options included
+    def searcher(game, depth):
+        result = run_agent(game, depth, 'small', agent, dict(options))
+        return result.move, result.value
+    check(game_choice, searcher, options, count=5)
+
+@pytest.mark.parametrize('game_choice, agent, options', [('nim', 'cmp3', {'time': '1'}), ('nim', 'cmp4', {'selective': True}),
+                                                          ('connectfour', 'cmp2', {'extra-turn': True}),
+                                                          ('nim', 'cmp1', {'eval': 'vector'}), ('nim', 'cmp1', {'lazysmp': '2'}),
+                                                          ('connectfour', 'cmp3', {'ordering': True}), ('nim', 'cmp5', {'symmetry': True})])
+def test_rejected(game_choice, agent, options):
+    # combinations an agent can't run are refused before anything runs
+    with pytest.raises(ValueError):
+        agent_settings(game_choice, agent, options)
+
+def test_benchmark_options():
+    # the benchmark's agents run as main.py runs them, with the command line's options (its --seed
+    # picks positions and stays with the benchmark)
+    game, depth = make_game('connectfour', 'small', 'initial', {})
+    for agent, main_agent, selecting in [('cmp4', 'cmp4', {}), ('pvs+tt', 'cmp5', {'pvs': True}), ('mtdf', 'cmp4', {'mtdf': True})]:
+        expected = run_agent(copy.deepcopy(game), depth, 'small', main_agent, {'ordering': True, 'tt-mb': '0.01', **selecting})
+        _, nodes, tt_stats = benchmark.run(agent, game, depth, 'small', {'ordering': True, 'tt-mb': '0.01', 'seed': '3'})
+        assert (nodes, tt_stats) == (expected.nodes, expected.tt_stats)
+
+def test_unknown_option(capsys):
+    # a misspelt flag prints the usage instead of running without the option
+    assert parse_options(['--pvs', '--tt-mb=1']) == {'pvs': True, 'tt-mb': '1'}
+    with pytest.raises(SystemExit):
+        parse_options(['--pvs', '--simmetry'])
+    assert capsys.readouterr().out.startswith("Usage:")
+
+@pytest.mark.parametrize('heaps', [[6], [5], [9], [4, 7], [2, 6], [3, 3, 5]])
+def test_budgeted_nim(heaps):
+    # small nim is the subtraction game {1, 2, 3}, where the nim-sum heuristic is wrong: a budgeted
+    # search may only stop early on a real result, so it ends where a deep fixed-depth search does
+    # the small initial position drops the first two heaps
+    game = Nim(True, 'small', heaps=[0, 0] + heaps)
+    fixed = alphabeta(copy.deepcopy(game), 12, 'small', -INF, INF, True, SearchStats(), TranspositionTable())
+    solved = nim_solver_search(game, 'small', True, SearchStats())
+    for move, result in [iterative_deepening(game, 'small', True, SearchStats(), TranspositionTable(), node_limit=200000)[:2],
+                         selective_search(game, 'small', True, SearchStats(), node_limit=200000, beam=None)[:2]]:
+        assert result == fixed[1]
+        assert (result > 0) == (solved[1] > 0)
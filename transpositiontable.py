@@ -1,43 +1,308 @@
+from array import array
+from zobrist import MASK64
+from scores import within_depth, score_at_ply, score_from_ply
+
 EXACT = 0
 LOWERBOUND = 1
 UPPERBOUND = 2
 
+# replacement schemes for bounded tables
+DEPTH_PREFERRED = 'depth'    # keep the deeper entry
+ALWAYS_REPLACE = 'always'    # newest entry wins
+TWO_TIER = 'twotier'         # buckets of two: one depth-preferred slot, one always-replace slot
+AGING = 'aging'              # depth-preferred, but entries from older searches are always replaceable
+REPLACEMENT_SCHEMES = [DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER, AGING]
+
+# rough resident cost of one filled slot (entry tuple + its slot references), used to turn a memory budget into slots
+ENTRY_BYTES = 160
+# packed slot: key (8) + value (4, scores are 32-bit ints) + move (2) + depth (1) + flag (1) + age (1)
+PACKED_ENTRY_BYTES = 17
+
+EMPTY_FLAG = 255
+
+# moves as 16-bit codes: 2-bit tag + 14-bit payload (0 is "no move")
+#   tag 1: connect four column         tag 2: nim (heap, remove)
+#   tag 3: dots and boxes line         tag 0: index into a per-table list of other moves
+MOVE_NONE = 0
+
+def encode_move(move):
+    if move is None:
+        return MOVE_NONE
+    if type(move) is int and 0 <= move < (1 << 14):
+        return (1 << 14) | move
+    if type(move) is tuple and len(move) == 2 and type(move[0]) is int and type(move[1]) is int and 0 <= move[0] < 128 and 0 <= move[1] < 128:
+        return (2 << 14) | (move[0] << 7) | move[1]
+    if type(move) is tuple and len(move) == 3 and move[0] in ('h', 'v') and 0 <= move[1] < 64 and 0 <= move[2] < 64:
+        return (3 << 14) | ((move[0] == 'v') << 12) | (move[1] << 6) | move[2]
+    return None
+
+def decode_move(code):
+    tag = code >> 14
+    if tag == 1:
+        return code & 0x3FFF
+    if tag == 2:
+        return ((code >> 7) & 0x7F, code & 0x7F)
+    if tag == 3:
+        return ('v' if code >> 12 & 1 else 'h', (code >> 6) & 0x3F, code & 0x3F)
+    return None
+
+class BoundedStore:
+    # fixed number of slots indexed by key hash; stands in for the unbounded dicts
+    # entries are (depth, value, best_move, flag) tuples
+    def __init__(self, slots, replacement):
+        if replacement not in REPLACEMENT_SCHEMES:
+            raise ValueError(f"unknown replacement scheme: {replacement}")
+        self.replacement = replacement
+        self.slots = max(2, slots - slots % 2)
+        self.allocated = False
+        self.generation = 0
+        self.count = 0
+        self.collisions = 0
+        self.overwrites = 0
+
+    def __len__(self):
+        return self.count
+
+    # slot primitives (overridden by PackedStore)
+    def allocate(self):
+        self.keys = [None] * self.slots
+        self.entries = [None] * self.slots
+        self.ages = [0] * self.slots
+
+    def normalize(self, key):
+        return key
+
+    def key_at(self, index):
+        return self.keys[index]
+
+    def depth_at(self, index):
+        return self.entries[index][0]
+
+    def entry_at(self, index):
+        return self.entries[index]
+
+    def age_matches(self, index):
+        return self.ages[index] == self.generation
+
+    def set_slot(self, index, key, entry):
+        self.keys[index] = key
+        self.entries[index] = entry
+        self.ages[index] = self.generation
+
+    def clear_slot(self, index):
+        self.keys[index] = None
+
+    def get(self, key):
+        if not self.allocated:
+            return None
+        key = self.normalize(key)
+        if self.replacement == TWO_TIER:
+            index = (hash(key) % (self.slots // 2)) * 2
+            if self.key_at(index) == key:
+                return self.entry_at(index)
+            if self.key_at(index + 1) == key:
+                return self.entry_at(index + 1)
+            if self.key_at(index) is not None or self.key_at(index + 1) is not None:
+                self.collisions += 1
+            return None
+
+        index = hash(key) % self.slots
+        stored_key = self.key_at(index)
+        if stored_key == key:
+            return self.entry_at(index)
+        if stored_key is not None:
+            self.collisions += 1
+        return None
+
+    def __setitem__(self, key, entry):
+        # slots are only allocated on first store (an agent fills just one of ab/mm)
+        if not self.allocated:
+            self.allocate()
+            self.allocated = True
+        key = self.normalize(key)
+        if self.replacement == TWO_TIER:
+            index = (hash(key) % (self.slots // 2)) * 2
+            stored_key = self.key_at(index)
+            if self.key_at(index + 1) == key:
+                index += 1
+            elif stored_key != key and stored_key is not None:
+                if entry[0] < self.depth_at(index):
+                    # shallower than the depth-preferred slot ==> always-replace slot
+                    index += 1
+                else:
+                    # deeper ==> take the depth-preferred slot, demote its entry
+                    self.write(index + 1, stored_key, self.entry_at(index))
+                    self.clear_slot(index)
+                    self.count -= 1
+            self.write(index, key, entry)
+            return
+
+        index = hash(key) % self.slots
+        stored_key = self.key_at(index)
+        if stored_key is not None and stored_key != key:
+            stored_depth = self.depth_at(index)
+            if self.replacement == DEPTH_PREFERRED and entry[0] < stored_depth:
+                return
+            if self.replacement == AGING and entry[0] < stored_depth and self.age_matches(index):
+                return
+        self.write(index, key, entry)
+
+    def items(self):
+        # (key, entry) for every occupied slot, like dict.items()
+        if not self.allocated:
+            return
+        for index in range(self.slots):
+            key = self.key_at(index)
+            if key is not None:
+                yield key, self.entry_at(index)
+
+    def write(self, index, key, entry):
+        stored_key = self.key_at(index)
+        if stored_key is None:
+            self.count += 1
+        elif stored_key != key:
+            self.overwrites += 1
+        self.set_slot(index, key, entry)
+
+class PackedStore(BoundedStore):
+    # same slots and replacement as BoundedStore, but kept in preallocated typed columns
+    # instead of one tuple per entry; keys are reduced to 64 bits
+    def allocate(self):
+        self.keys = array('Q', bytes(8 * self.slots))
+        self.values = array('i', bytes(4 * self.slots))
+        self.moves = array('H', bytes(2 * self.slots))
+        self.depths = array('b', bytes(self.slots))
+        self.flags = array('B', [EMPTY_FLAG]) * self.slots
+        self.ages = array('B', bytes(self.slots))
+        # moves encode_move can't pack are numbered per table instead
+        self.other_moves = []
+        self.other_codes = {}
+
+    def normalize(self, key):
+        return (key if type(key) is int else hash(key)) & MASK64
+
+    def key_at(self, index):
+        return None if self.flags[index] == EMPTY_FLAG else self.keys[index]
+
+    def depth_at(self, index):
+        return self.depths[index]
+
+    def entry_at(self, index):
+        code = self.moves[index]
+        move = decode_move(code) if code >> 14 else (self.other_moves[code - 1] if code else None)
+        return (self.depths[index], self.values[index], move, self.flags[index])
+
+    def set_slot(self, index, key, entry):
+        depth, value, move, flag = entry
+        code = encode_move(move)
+        if code is None:
+            code = self.other_codes.get(move)
+            if code is None:
+                if len(self.other_moves) + 1 < (1 << 14):
+                    self.other_moves.append(move)
+                    code = self.other_codes[move] = len(self.other_moves)
+                else:
+                    code = MOVE_NONE
+        self.keys[index] = key
+        self.values[index] = value
+        self.moves[index] = code
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.ages[index] = self.generation & 0xFF
+
+    def clear_slot(self, index):
+        self.flags[index] = EMPTY_FLAG
+
+    def age_matches(self, index):
+        return self.ages[index] == self.generation & 0xFF
+
 class TranspositionTable:
-    def __init__(self):
-        self.ab_table = {}
-        self.mm_table = {}
-
-    # used for both alpha-beta and scout
-    def ab_lookup(self, state_key, depth, alpha, beta):
-        if state_key in self.ab_table:
-            stored_depth, value, best_move, flag, stored_alpha, stored_beta = self.ab_table[state_key]
-            if stored_depth >= depth:
-                if flag == EXACT:
+    # memory_mb=None keeps the original unbounded dicts; packed=True stores a bounded table in typed arrays
+    def __init__(self, memory_mb=None, replacement=DEPTH_PREFERRED, packed=False):
+        self.memory_mb = memory_mb
+        self.replacement = replacement
+        self.packed = packed
+        if memory_mb is None:
+            self.ab_table = {}
+            self.mm_table = {}
+        else:
+            entry_bytes = PACKED_ENTRY_BYTES if packed else ENTRY_BYTES
+            slots = int(memory_mb * 1024 * 1024) // entry_bytes
+            store = PackedStore if packed else BoundedStore
+            self.ab_table = store(slots, replacement)
+            self.mm_table = store(slots, replacement)
+        self.hits = 0
+        self.misses = 0
+        # lookups answered by an entry, by its flag
+        self.cutoffs = [0, 0, 0]
+
+    # start of a new search: entries from earlier searches become replaceable under AGING
+    def new_search(self):
+        for table in (self.ab_table, self.mm_table):
+            if isinstance(table, BoundedStore):
+                table.generation += 1
+
+    def stats(self):
+        stats = {'hits': self.hits, 'misses': self.misses, 'collisions': 0, 'overwrites': 0,
+                 'entries': len(self.ab_table) + len(self.mm_table)}
+        for table in (self.ab_table, self.mm_table):
+            if isinstance(table, BoundedStore):
+                stats['collisions'] += table.collisions
+                stats['overwrites'] += table.overwrites
+        return stats
+
+    # every stored entry as ('ab' or 'mm', key, (depth, value, best_move, flag))
+    def items(self):
+        for name, table in (('ab', self.ab_table), ('mm', self.mm_table)):
+            for key, entry in table.items():
+                yield name, key, entry
+
+    # used for both alpha-beta and scout; ply = the node's distance from the root, values are
+    # stored relative to their node (see scores)
+    def ab_lookup(self, state_key, depth, alpha, beta, ply=0):
+        entry = self.ab_table.get(state_key)
+        if entry is None:
+            self.misses += 1
+            return False, None, None
+        self.hits += 1
+        stored_depth, value, best_move, flag = entry
+        if stored_depth >= depth and within_depth(value, depth):
+            value = score_at_ply(value, ply)
+            if flag == EXACT:
+                self.cutoffs[EXACT] += 1
+                return True, best_move, value
+            elif flag == LOWERBOUND:
+                if value > alpha:
+                    alpha = value
+                if alpha >= beta:
+                    self.cutoffs[LOWERBOUND] += 1
                     return True, best_move, value
-                elif flag == LOWERBOUND:
-                    if value > alpha:
-                        alpha = value
-                    if alpha >= beta:
-                        return True, best_move, value
-                elif flag == UPPERBOUND:
-                    if value < beta:
-                        beta = value
-                    if alpha >= beta:
-                        return True, best_move, value
-        return False, None, None
+            elif flag == UPPERBOUND:
+                if value < beta:
+                    beta = value
+                if alpha >= beta:
+                    self.cutoffs[UPPERBOUND] += 1
+                    return True, best_move, value
+        # not usable as a result, but the stored move is still the best first guess
+        return False, best_move, None
 
-    # used for both alpha-beta and scout
-    def ab_store(self, state_key, depth, value, best_move, flag, alpha, beta):
-        self.ab_table[state_key] = (depth, value, best_move, flag, alpha, beta)
+    # used for both alpha-beta and scout (the search window is not needed to use an entry, so it isn't kept)
+    def ab_store(self, state_key, depth, value, best_move, flag, alpha, beta, ply=0):
+        self.ab_table[state_key] = (depth, score_from_ply(value, ply), best_move, flag)
 
     # used for just minimax algorithms
-    def mm_lookup(self, state_key, depth):
-        if state_key in self.mm_table:
-            stored_depth, value, best_move = self.mm_table[state_key]
-            if stored_depth >= depth:
-                return True, best_move, value
+    def mm_lookup(self, state_key, depth, ply=0):
+        entry = self.mm_table.get(state_key)
+        if entry is None:
+            self.misses += 1
+            return False, None, None
+        self.hits += 1
+        stored_depth, value, best_move, _ = entry
+        if stored_depth >= depth and within_depth(value, depth):
+            self.cutoffs[EXACT] += 1
+            return True, best_move, score_at_ply(value, ply)
         return False, None, None
 
     # used for just minimax algorithms
-    def mm_store(self, state_key, depth, value, best_move):
-        self.mm_table[state_key] = (depth, value, best_move)
+    def mm_store(self, state_key, depth, value, best_move, ply=0):
+        self.mm_table[state_key] = (depth, score_from_ply(value, ply), best_move, EXACT)
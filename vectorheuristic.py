@@ -0,0 +1,159 @@
+from connectfour import EMPTY, PLAYER1, PLAYER2
+from heuristic import evaluate_window
+from scores import PROVEN_WIN, KNOWN_WIN
+
+# numpy is optional: without it only the incremental evaluator is available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# evaluate_window depends only on how many of the window's cells are the player's and the opponent's:
+# WINDOW_SCORE[own][opponent]
+WINDOW_SCORE = [[evaluate_window([PLAYER1] * own + [PLAYER2] * opponent + [EMPTY] * (4 - own - opponent), PLAYER1)
+                 if own + opponent <= 4 else 0 for opponent in range(5)] for own in range(5)]
+WINDOW_SCORE_ARRAY = np.array(WINDOW_SCORE) if np is not None else None
+CENTER_WEIGHT = 3
+
+windows_cache = {}
+
+def board_windows(rows, cols):
+    # every four-cell window of evaluate_connect_four as flat cell indices (row * cols + col), plus the
+    # windows through each cell; built once per board size
+    if (rows, cols) not in windows_cache:
+        windows = []
+        for row in range(rows):
+            for col in range(cols - 3):
+                windows.append([row * cols + col + i for i in range(4)])
+        for col in range(cols):
+            for row in range(rows - 3):
+                windows.append([(row + i) * cols + col for i in range(4)])
+        for row in range(rows - 3):
+            for col in range(cols - 3):
+                windows.append([(row + i) * cols + col + i for i in range(4)])
+        for row in range(3, rows):
+            for col in range(cols - 3):
+                windows.append([(row - i) * cols + col + i for i in range(4)])
+        cell_windows = [[w for w, window in enumerate(windows) if cell in window] for cell in range(rows * cols)]
+        windows_cache[(rows, cols)] = (windows, cell_windows)
+    return windows_cache[(rows, cols)]
+
+index_cache = {}
+
+def window_index_array(rows, cols):
+    # (windows, 4) index array and the center column's cells, for gathering from flat boards
+    if (rows, cols) not in index_cache:
+        windows, _ = board_windows(rows, cols)
+        index_cache[(rows, cols)] = (np.array(windows, dtype=np.intp),
+                                     np.array([row * cols + cols // 2 for row in range(rows)], dtype=np.intp))
+    return index_cache[(rows, cols)]
+
+def board_array(game):
+    # flat int8 copy of the board (top row first, like game.board)
+    return np.array(game.board, dtype=np.int8).reshape(-1)
+
+def evaluate_batch(boards, player, rows, cols):
+    # evaluate_connect_four for many boards at once: boards is an (n, rows * cols) array of cells,
+    # returns the n scores for player
+    if np is None:
+        raise RuntimeError("batch evaluation needs numpy")
+    windows, center = window_index_array(rows, cols)
+    boards = np.asarray(boards).reshape(-1, rows * cols)
+    cells = boards[:, windows]
+    own = (cells == player).sum(axis=2)
+    opponent = (cells == -player).sum(axis=2)
+    scores = WINDOW_SCORE_ARRAY[own, opponent].sum(axis=1)
+    return scores + CENTER_WEIGHT * (boards[:, center] == player).sum(axis=1)
+
+def evaluate_nim_batch(heaps, color, grundy=None):
+    # side-to-move scores for rows of heap sizes: a nonzero nim-sum (of grundy values, if a table is
+    # given: exact, like the solver oracle) wins, like evaluate_nim (a heuristic verdict otherwise)
+    if np is None:
+        raise RuntimeError("batch evaluation needs numpy")
+    heaps = np.asarray(heaps, dtype=np.int64)
+    if grundy is not None:
+        heaps = np.asarray(grundy, dtype=np.int64)[heaps]
+    nim_sum = np.bitwise_xor.reduce(heaps, axis=1)
+    win = PROVEN_WIN if grundy is not None else KNOWN_WIN
+    return np.where(nim_sum != 0, win, -win)
+
+def evaluate_dots_and_boxes_batch(margins, color):
+    # margins are PLAYER1's boxes minus PLAYER2's
+    if np is None:
+        raise RuntimeError("batch evaluation needs numpy")
+    return color * np.asarray(margins, dtype=np.int64)
+
+def evaluate_connect_four_vectorized(game, player):
+    return int(evaluate_batch(board_array(game), player, game.rows, game.cols)[0])
+
+class IncrementalEvaluator:
+    # evaluate_connect_four kept up to date move by move: a move only changes the windows through its
+    # cell, so make/undo re-score those (at most 13 on 6x7) instead of every window at every leaf.
+    # attach with game.evaluator = IncrementalEvaluator(game); the game calls place/remove
+    def __init__(self, game):
+        self.cols = game.cols
+        self.center = game.cols // 2
+        self.windows, self.cell_windows = board_windows(game.rows, game.cols)
+        self.load(game.board)
+
+    def load(self, board):
+        self.counts = {PLAYER1: [0] * len(self.windows), PLAYER2: [0] * len(self.windows)}
+        self.scores = {PLAYER1: 0, PLAYER2: 0}
+        for w, window in enumerate(self.windows):
+            for cell in window:
+                piece = board[cell // self.cols][cell % self.cols]
+                if piece != EMPTY:
+                    self.counts[piece][w] += 1
+        for w in range(len(self.windows)):
+            own, opponent = self.counts[PLAYER1][w], self.counts[PLAYER2][w]
+            self.scores[PLAYER1] += WINDOW_SCORE[own][opponent]
+            self.scores[PLAYER2] += WINDOW_SCORE[opponent][own]
+        for row in board:
+            if row[self.center] != EMPTY:
+                self.scores[row[self.center]] += CENTER_WEIGHT
+
+    def update(self, row, col, player, change):
+        counts1 = self.counts[PLAYER1]
+        counts2 = self.counts[PLAYER2]
+        mine = counts1 if player == PLAYER1 else counts2
+        score1 = self.scores[PLAYER1]
+        score2 = self.scores[PLAYER2]
+        for w in self.cell_windows[row * self.cols + col]:
+            a, b = counts1[w], counts2[w]
+            score1 -= WINDOW_SCORE[a][b]
+            score2 -= WINDOW_SCORE[b][a]
+            mine[w] += change
+            a, b = counts1[w], counts2[w]
+            score1 += WINDOW_SCORE[a][b]
+            score2 += WINDOW_SCORE[b][a]
+        self.scores[PLAYER1] = score1
+        self.scores[PLAYER2] = score2
+        if col == self.center:
+            self.scores[player] += change * CENTER_WEIGHT
+
+    def place(self, row, col, player):
+        self.update(row, col, player, 1)
+
+    def remove(self, row, col, player):
+        self.update(row, col, player, -1)
+
+    def score(self, player):
+        return self.scores[player]
+
+class VectorEvaluator:
+    # same interface, scoring the whole board with array operations at every leaf (nothing to update)
+    def __init__(self, game):
+        if np is None:
+            raise RuntimeError("vectorized evaluation needs numpy")
+        self.game = game
+
+    def place(self, row, col, player):
+        pass
+
+    def remove(self, row, col, player):
+        pass
+
+    def score(self, player):
+        return evaluate_connect_four_vectorized(self.game, player)
+
+EVALUATORS = {'incremental': IncrementalEvaluator, 'vector': VectorEvaluator}
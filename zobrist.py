@@ -0,0 +1,18 @@
+import random
+
+# fixed seeds so keys (and anything persisted under them) are identical across processes
+SIDE_KEY = random.Random('side').getrandbits(64)
+MASK64 = (1 << 64) - 1
+
+def zobrist_keys(name, count):
+    rng = random.Random(name)
+    return [rng.getrandbits(64) for _ in range(count)]
+
+def player_keys(name, count):
+    # one key per player, indexable by the player value itself:
+    # keys[1] is PLAYER1 and keys[-1] is PLAYER2 (index 0 is unused)
+    keys = zobrist_keys(name, 2 * count)
+    return [(0, keys[2 * n], keys[2 * n + 1]) for n in range(count)]
+
+def side_to_move(key, maximizingPlayer):
+    return key ^ SIDE_KEY if maximizingPlayer else key